@@ -1,16 +1,37 @@
 # 学習時間管理アプリケーション
 # 機能：タイマー、学習目標管理、試験目標管理、模試結果管理、学習履歴管理
 
+# 起動時間計測の基準（--profile-startup 用）
+import time
+_MODULE_START = time.perf_counter()
+
 # 必要なライブラリのインポート
+# visualize（matplotlib）と report_generator（fpdf・matplotlib）は重いため、ここでは読み込まない。
+# ウィンドウ描画後にバックグラウンドで先読みし、未完了ならボタン押下時に読み込む。
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import tkinter.font as font
+import argparse
+import importlib
 import platform
+import sys
+import threading
 from datetime import datetime, timedelta
-from visualize import show_analysis_window  # グラフ表示機能
 import database  # データベース操作機能
-import report_generator  # レポート生成機能
-import pandas as pd  # データ分析用
+from jobs import JobExecutor  # バックグラウンド処理（DB・レポート）
+import importer  # CSV/JSONLの一括インポート
+import timer  # タイマーエンジン（通常/ポモドーロ）
+import journal  # セッションジャーナル（異常終了時の復旧用）
+
+_IMPORTS_DONE = time.perf_counter()
+
+# 起動後にバックグラウンドで先読みする重いモジュール
+DEFERRED_MODULES = ("visualize", "report_generator")
+
+# 学習履歴の仮想リスト設定
+HISTORY_PAGE_SIZE = 100         # 1回のDB読み込みで取得する行数
+HISTORY_PREFETCH_MARGIN = 0.2   # 表示範囲の端がこの割合に近づいたら隣のページを先読み
+HISTORY_MAX_ROWS = HISTORY_PAGE_SIZE * 5  # 一覧に保持する最大行数（超えた分は表示範囲から遠い側を削除）
 
 # カレンダー機能の利用可能性をチェック
 try:
@@ -19,29 +40,107 @@ try:
 except ImportError:
     CALENDAR_AVAILABLE = False  # カレンダーウィジェットが利用不可
 
+def warm_up_modules(on_done=None):
+    """重いモジュールをバックグラウンドスレッドで読み込む（インポート済みなら何もしない）"""
+    def run():
+        start = time.perf_counter()
+        for name in DEFERRED_MODULES:
+            importlib.import_module(name)
+        if on_done:
+            on_done(time.perf_counter() - start)
+    threading.Thread(target=run, name="module-warmup", daemon=True).start()
+
+
+def find_sorted_index(tree, column, value, descending=False):
+    """ソート済みTreeviewで value を挿入すべき位置を二分探索で求める（全件の再読み込みを避けるため）"""
+    children = tree.get_children()
+    lo, hi = 0, len(children)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        current = tree.set(children[mid], column)
+        if (current >= value) if descending else (current <= value):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+# --- Treeviewの表示行への変換 ---
+# database.fetch_* の行（namedtuple）をカーソルから受け取ったまま1パスで整形する。
+# 一覧の読み込みと1行だけの追加・更新で同じ関数を使う。
+
+def blank_if_none(value):
+    """DBのNULLを表示用の空文字に変換する"""
+    return '' if value is None else value
+
+
+def study_record_values(row):
+    """学習記録の行 (StudyRecord) を表示用の値に変換（学習時間は秒で保存、時:分:秒で表示）"""
+    record_id, date, start_time, subject, seconds = row
+    return (record_id, date, blank_if_none(start_time), subject, timer.format_clock(seconds))
+
+
+def mock_exam_values(row):
+    """模試結果の行 (MockExam) を表示用の値に変換"""
+    return tuple(blank_if_none(value) for value in row)
+
+
+def exam_goal_item(row):
+    """試験目標の行 (ExamGoal) を表示用の値とタグに変換"""
+    goal_id, subject, exam_name, exam_date, target_score, status, notes = row
+    values = (goal_id, blank_if_none(exam_date), subject, exam_name, target_score, status, blank_if_none(notes))
+    return values, (status.replace(' ', ''),)  # 達成状況をタグにして色分け
+
+
+def study_goal_values(row):
+    """学習目標の行 (Goal) を表示用の値に変換（最後の列は並び順判定用の開始日）"""
+    goal_id, goal_type, subject, start_date, target_minutes, notes = row
+    return (goal_id, goal_type.capitalize(), subject, target_minutes, blank_if_none(notes), start_date)
+
+
+def mock_exam_rows(rows):
+    """模試結果タブの表示行"""
+    return list(map(mock_exam_values, rows))
+
+
+def exam_goal_rows(rows):
+    """試験目標タブの表示行と色分けタグ"""
+    return list(map(exam_goal_item, rows))
+
+
+def study_goal_rows(rows):
+    """学習目標タブの表示行"""
+    return list(map(study_goal_values, rows))
+
+
 class StudyTimerApp:
     """学習時間管理アプリケーションのメインクラス"""
     
-    def __init__(self, root):
+    def __init__(self, root, profile=database.DEFAULT_PROFILE):
         """アプリケーションの初期化"""
         self.root = root
-        self.root.title("Study Time Logger")
         self.root.geometry("1000x800")  # 全UI要素が表示されるサイズに設定
 
-        # データベースの初期化
-        database.init_db()
+        # データベースの初期化（プロファイルのDBを開き、必要ならスキーマを移行する）
+        database.set_profile(profile)
+        self.update_title()
 
-        # タイマーの状態管理変数
-        self.timer_running = False      # タイマーが動作中かどうか
-        self.is_paused = False          # タイマーが一時停止中かどうか
-        self.start_time = None          # タイマー開始時刻
-        self.elapsed_time = timedelta(0) # 経過時間
-        self.after_id = None            # タイマー更新用ID
+        # DB操作やレポート生成はワーカースレッドで実行し、結果をUIスレッドで受け取る
+        # （タイマー表示などのイベントループを止めないため）
+        self.jobs = JobExecutor(root, on_busy_change=self.on_jobs_busy_change)
+        self.progress_request = 0  # 進捗表示の最新リクエスト番号（古い結果を捨てるため）
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
-        # ポモドーロタイマーの状態管理
-        self.pomodoro_mode = tk.BooleanVar()  # ポモドーロモードのオン/オフ
-        self.pomodoro_state = None            # 現在の状態（作業中/休憩中）
-        self.pomodoro_cycles = 0              # 完了したポモドーロサイクル数
+        # タイマーの状態はtimerモジュールのエンジン（Tkに依存しない状態機械）が持つ
+        self.timer = None               # 現在のエンジン（通常: Stopwatch / ポモドーロ: Pomodoro）
+        self.after_id = None            # 次のタイマー更新の予約ID
+        self.shown_seconds = None       # 表示中の秒数（変わったときだけラベルを更新する）
+        self.started_at = None          # 計測を開始した時刻（壁時計。記録の開始時刻になる）
+        # 計測中のイベントをDBに追記するジャーナル（書き込みはバックグラウンドでまとめてコミット）
+        self.journal = journal.SessionJournal()
+
+        # ポモドーロモードのオン/オフ
+        self.pomodoro_mode = tk.BooleanVar()
 
         # UI初期設定とデータ読み込み
         self.setup_styles()              # スタイル設定
@@ -51,7 +150,7 @@ class StudyTimerApp:
         self.load_study_goals()          # 学習目標データ読み込み
         self.load_study_history()        # 学習履歴データ読み込み
         self.update_progress_display()   # 進捗表示を更新
-
+        self.recover_unfinished_sessions()  # 前回保存されなかったセッションを復旧
     def setup_styles(self):
         """アプリケーションの見た目・スタイルを設定"""
         # OS別にフォントファミリーを選択
@@ -91,6 +190,28 @@ class StudyTimerApp:
 
     def setup_ui(self):
         """メインUIの構築（タブ形式でそれぞれの機能を整理）"""
+        # バックグラウンド処理中の表示（ステータスバー）。タブより先に下端へ配置する
+        self.status_frame = ttk.Frame(self.root)
+        self.status_frame.pack(side="bottom", fill="x", padx=10, pady=(0, 5))
+        self.status_label = ttk.Label(self.status_frame, text="")
+        self.status_label.pack(side="left")
+        self.status_progressbar = ttk.Progressbar(self.status_frame, mode="indeterminate", length=150)
+
+        # プロファイル（利用者）切り替え。利用者ごとに別のDBファイルを使う
+        profile_frame = ttk.Frame(self.root)
+        profile_frame.pack(side="top", fill="x", padx=10, pady=(10, 0))
+        ttk.Label(profile_frame, text="Profile:").pack(side="left")
+        self.profile_var = tk.StringVar(value=database.PROFILE)
+        # 一覧にない名前を入力すると新しいプロファイルを作成する
+        self.profile_menu = ttk.Combobox(profile_frame, textvariable=self.profile_var,
+                                         values=database.list_profiles(), width=20)
+        self.profile_menu.pack(side="left", padx=5)
+        self.profile_menu.bind("<<ComboboxSelected>>", self.switch_profile)
+        self.profile_menu.bind("<Return>", self.switch_profile)
+        ttk.Button(profile_frame, text="Switch", command=self.switch_profile).pack(side="left")
+        # 科目の編集（科目一覧はDBのsubjectsテーブルから読み込む）
+        ttk.Button(profile_frame, text="Subjects...", command=self.open_subject_editor).pack(side="right")
+
         # メインのタブコンテナを作成
         notebook = ttk.Notebook(self.root)
         notebook.pack(pady=10, padx=10, fill="both", expand=True)
@@ -146,8 +267,8 @@ class StudyTimerApp:
                                                style="Goal.TProgressbar")
         self.goal_progressbar.pack(pady=5)
 
-        # 学習科目の選択メニュー
-        self.subjects = ["Chemistry", "English", "Information", "Japanese", "Math", "Physics", "Social Studies"]
+        # 学習科目の選択メニュー（科目一覧はDBから読み込む。小さな表なので起動時は同期で読む）
+        self.subjects = [subject.name for subject in database.fetch_subjects()]
         self.selected_subject = tk.StringVar(value=self.subjects[0])  # デフォルトは最初の科目
         
         # 科目変更時に進捗表示を更新するトリガーを設定
@@ -224,13 +345,14 @@ class StudyTimerApp:
         weekly_radio.pack(side="left")
 
         # 対象科目の選択（「全科目」または個別科目）
-        all_subjects = ["All"] + self.subjects  # 「全科目」オプションを追加
+        all_subjects = [database.ALL_SUBJECTS] + self.subjects  # 「全科目」オプションを追加
         self.study_goal_subject = tk.StringVar(value=all_subjects[0])  # デフォルトは「全科目」
         ttk.Label(input_frame, text="Subject:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
         
         # 科目選択用プルダウンメニュー
-        subject_menu = ttk.OptionMenu(input_frame, self.study_goal_subject, all_subjects[0], *all_subjects)
-        subject_menu.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+        self.study_goal_subject_menu = ttk.OptionMenu(input_frame, self.study_goal_subject,
+                                                      all_subjects[0], *all_subjects)
+        self.study_goal_subject_menu.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
 
         # 目標時間（分単位）の入力
         ttk.Label(input_frame, text="Target (minutes):").grid(row=2, column=0, padx=5, pady=5, sticky="w")
@@ -252,8 +374,9 @@ class StudyTimerApp:
 
         # 学習目標一覧用のテーブルウィジェット
         self.study_goals_tree = ttk.Treeview(tree_frame, 
-                                           columns=("ID", "Type", "Subject", "Target", "Notes"), 
-                                           show="headings")
+                                           columns=("ID", "Type", "Subject", "Target", "Notes", "Start"), 
+                                           displaycolumns=("ID", "Type", "Subject", "Target", "Notes"),
+                                           show="headings")  # Startは並び順の判定用（非表示）
         
         # テーブルのカラム設定
         self.study_goals_tree.heading("ID", text="ID")
@@ -484,6 +607,11 @@ class StudyTimerApp:
                                   command=self.delete_mock_exam_callback)
         delete_button.pack(side="right", padx=5)
 
+        # CSV/JSONLファイルから模試結果をまとめて取り込むボタン
+        import_button = ttk.Button(buttons_frame, text="Import...",
+                                   command=lambda: self.open_import_dialog("mock_exams"))
+        import_button.pack(side="left", padx=5)
+
     def setup_study_history_tab(self, parent_tab):
         """学習履歴管理タブのUI構築（過去の学習記録を一覧表示・管理）"""
         # 学習履歴一覧表示用フレーム
@@ -492,7 +620,7 @@ class StudyTimerApp:
 
         # 学習履歴一覧用のテーブルウィジェット
         self.study_history_tree = ttk.Treeview(tree_frame, 
-                                             columns=("ID", "Date", "Subject", "Minutes"), 
+                                             columns=("ID", "Date", "Start", "Subject", "Duration"), 
                                              show="headings")
         
         # テーブルのカラム設定
@@ -500,17 +628,26 @@ class StudyTimerApp:
         self.study_history_tree.column("ID", width=40, stretch=tk.NO)  # IDは狭くして非伸縮
         self.study_history_tree.heading("Date", text="Date")        # 学習日
         self.study_history_tree.column("Date", width=100)
+        self.study_history_tree.heading("Start", text="Start")      # 開始時刻（移行前の記録は空欄）
+        self.study_history_tree.column("Start", width=70)
         self.study_history_tree.heading("Subject", text="Subject")  # 学習科目
         self.study_history_tree.column("Subject", width=150)
-        self.study_history_tree.heading("Minutes", text="Minutes")  # 学習時間（分）
-        self.study_history_tree.column("Minutes", width=80)
+        self.study_history_tree.heading("Duration", text="Duration")  # 学習時間（時:分:秒）
+        self.study_history_tree.column("Duration", width=80)
 
-        # テーブル用スクロールバー
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.study_history_tree.yview)
-        self.study_history_tree.configure(yscroll=scrollbar.set)
-        scrollbar.pack(side="right", fill="y")
+        # テーブル用スクロールバー（スクロール位置を監視して次のページを読み込む）
+        self.study_history_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.study_history_tree.yview)
+        self.study_history_tree.configure(yscroll=self.on_study_history_scroll)
+        self.study_history_scrollbar.pack(side="right", fill="y")
         self.study_history_tree.pack(side="left", fill="both", expand=True)
 
+        # 仮想リストの状態（読み込み済みの最古ID・全件読み込み済みかどうか）
+        self.history_oldest_id = None
+        self.history_exhausted = False
+        self.history_newest_id = None      # 先頭行のID（最新の記録まで表示中ならNone）
+        self.history_page_pending = False  # ページ読み込み中フラグ
+        self.history_generation = 0        # 一覧をリセットした回数（リセット前の読み込み結果を捨てるため）
+
         # 学習記録操作用ボタンエリア
         buttons_frame = ttk.Frame(parent_tab)
         buttons_frame.pack(pady=5, padx=10, fill="x")
@@ -520,30 +657,42 @@ class StudyTimerApp:
                                   command=self.delete_study_history_callback)
         delete_button.pack(side="right", padx=5)
 
+        # CSV/JSONLファイルから学習記録をまとめて取り込むボタン
+        import_button = ttk.Button(buttons_frame, text="Import...",
+                                   command=lambda: self.open_import_dialog("study_log"))
+        import_button.pack(side="left", padx=5)
+
     def generate_report_callback(self):
-        """週間レポート生成のコールバック関数"""
-        filename = report_generator.generate_weekly_report()
+        """週間レポート生成のコールバック関数（生成はバックグラウンドで実行）"""
+        self.report_button.config(state="disabled")  # 生成中の二重実行を防ぐ
+        self.jobs.submit(self.run_weekly_report, on_done=self.on_report_done, on_error=self.on_report_error)
+
+    @staticmethod
+    def run_weekly_report():
+        """ワーカースレッド側：レポートモジュールを読み込み（先読み済みなら即座に返る）、PDFを生成"""
+        import report_generator
+        return report_generator.generate_weekly_report()
+
+    def on_report_done(self, filename):
+        self.report_button.config(state="normal")
         if filename:
             messagebox.showinfo("Report Generated", f"Successfully generated report: {filename}")
         else:
             messagebox.showwarning("Report Error", "No data available for the last 7 days to generate a report.")
 
+    def on_report_error(self, error):
+        self.report_button.config(state="normal")
+        messagebox.showerror("Report Error", f"Failed to generate the report: {error}")
+
     # --- Mock Exam Methods ---
     def load_mock_exams(self):
-        for item in self.mock_tree.get_children():
-            self.mock_tree.delete(item)
-        df = database.get_mock_exams()
-        for index, row in df.iterrows():
-            values = (
-                row['id'],
-                row['date'],
-                row['subject'],
-                row['exam_name'],
-                '' if pd.isna(row['score']) else int(row['score']),
-                '' if pd.isna(row['max_score']) else int(row['max_score']),
-                '' if pd.isna(row['deviation_value']) else row['deviation_value']
-            )
-            self.mock_tree.insert("", "end", values=values, iid=row['id'])
+        """模試結果を読み込む（DB読み込みと整形はバックグラウンド、表示はUIスレッド）"""
+        self.jobs.submit(lambda: mock_exam_rows(database.fetch_mock_exams()), on_done=self.show_mock_exams)
+
+    def show_mock_exams(self, rows):
+        self.mock_tree.delete(*self.mock_tree.get_children())
+        for values in rows:
+            self.mock_tree.insert("", "end", values=values, iid=values[0])
 
     def add_mock_exam_callback(self):
         if CALENDAR_AVAILABLE and hasattr(self.mock_date_entry, 'get_date'):
@@ -556,27 +705,26 @@ class StudyTimerApp:
         max_score = self.mock_max_score_entry.get()
         deviation = self.mock_deviation_entry.get()
 
-        if not date or not subject or not exam_name:
-            messagebox.showwarning("Input Error", "Date, Subject, and Exam Name are required.")
-            return
-
+        # 入力チェックは一括インポートと同じ検証関数を使う
         try:
-            if score and not score.isdigit(): raise ValueError("Score must be a number.")
-            if max_score and not max_score.isdigit(): raise ValueError("Max Score must be a number.")
-            if deviation: float(deviation)
+            database.validate_mock_exam(date, subject, exam_name, score, max_score, deviation)
         except ValueError as e:
             messagebox.showwarning("Input Error", str(e))
             return
 
-        database.add_mock_exam(date, subject, exam_name, score, max_score, deviation)
-        
-        self.mock_exam_name_entry.delete(0, tk.END)
-        self.mock_score_entry.delete(0, tk.END)
-        self.mock_max_score_entry.delete(0, tk.END)
-        self.mock_deviation_entry.delete(0, tk.END)
-        
-        self.load_mock_exams()
-        messagebox.showinfo("Success", "Mock exam result saved successfully.")
+        def on_saved(row):
+            self.mock_exam_name_entry.delete(0, tk.END)
+            self.mock_score_entry.delete(0, tk.END)
+            self.mock_max_score_entry.delete(0, tk.END)
+            self.mock_deviation_entry.delete(0, tk.END)
+
+            # 一覧は日付の新しい順なので、該当位置に1行だけ挿入する
+            index = find_sorted_index(self.mock_tree, "Date", row[1], descending=True)
+            self.mock_tree.insert("", index, values=mock_exam_values(row), iid=row[0])
+            messagebox.showinfo("Success", "Mock exam result saved successfully.")
+
+        self.jobs.submit(database.add_mock_exam, date, subject, exam_name, score, max_score, deviation,
+                         on_done=on_saved)
 
     def delete_mock_exam_callback(self):
         selected_item = self.mock_tree.focus()
@@ -586,16 +734,94 @@ class StudyTimerApp:
 
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete the selected result?"):
             exam_id = int(selected_item)
-            database.delete_mock_exam(exam_id)
-            self.load_mock_exams()
+            self.jobs.submit(database.delete_mock_exam, exam_id,
+                             on_done=lambda deleted: self.remove_tree_item(self.mock_tree, selected_item))
 
     # --- Study History Methods ---
     def load_study_history(self):
-        for item in self.study_history_tree.get_children():
-            self.study_history_tree.delete(item)
-        df = database.get_all_records()
-        for index, row in df.iterrows():
-            self.study_history_tree.insert("", "end", values=(row['id'], row['date'], row['subject'], row['minutes']), iid=row['id'])
+        """学習履歴を先頭ページから読み直す（全件ではなく表示分＋先読み分のみ取得）"""
+        self.study_history_tree.delete(*self.study_history_tree.get_children())
+        self.history_oldest_id = None
+        self.history_exhausted = False
+        self.history_newest_id = None
+        self.history_page_pending = False
+        self.history_generation += 1
+        self.load_next_study_history_page()
+
+    def load_next_study_history_page(self):
+        """キーセットページングで次のページ（より古い記録）をバックグラウンドで読み込む"""
+        if self.history_exhausted or self.history_page_pending:
+            return
+        self.history_page_pending = True
+        generation = self.history_generation
+        self.jobs.submit(database.get_records_page, self.history_oldest_id, HISTORY_PAGE_SIZE,
+                         on_done=lambda rows: self.show_study_history_page(rows, generation))
+
+    def show_study_history_page(self, rows, generation):
+        """読み込んだページを一覧の末尾に追加する（UIスレッド）"""
+        if generation != self.history_generation:
+            return  # 読み込み中に一覧がリセットされた
+        self.history_page_pending = False
+        for row in rows:
+            if not self.study_history_tree.exists(row[0]):  # 保存直後の記録は追加済みの場合がある
+                self.study_history_tree.insert("", "end", values=study_record_values(row), iid=row[0])
+        if len(rows) < HISTORY_PAGE_SIZE:
+            self.history_exhausted = True  # これ以上古い記録はない
+        if rows:
+            self.history_oldest_id = rows[-1][0]
+        self.trim_study_history(from_top=True)
+
+    def load_newer_study_history_page(self):
+        """先頭から削除した行を、上へスクロールして戻ったときにキーで読み直す"""
+        if self.history_newest_id is None or self.history_page_pending:
+            return
+        self.history_page_pending = True
+        generation = self.history_generation
+        self.jobs.submit(database.get_records_page, None, HISTORY_PAGE_SIZE, self.history_newest_id,
+                         on_done=lambda rows: self.show_newer_study_history_page(rows, generation))
+
+    def show_newer_study_history_page(self, rows, generation):
+        """読み込んだページを一覧の先頭に追加する（UIスレッド）"""
+        if generation != self.history_generation:
+            return
+        self.history_page_pending = False
+        inserted = 0
+        for row in rows:
+            if not self.study_history_tree.exists(row[0]):
+                self.study_history_tree.insert("", inserted, values=study_record_values(row), iid=row[0])
+                inserted += 1
+        self.study_history_tree.yview_scroll(inserted, "units")  # 見ていた行が動かないように
+        if len(rows) < HISTORY_PAGE_SIZE:
+            self.history_newest_id = None  # 最新の記録まで戻った
+        elif rows:
+            self.history_newest_id = rows[0][0]
+        self.trim_study_history(from_top=False)
+
+    def trim_study_history(self, from_top):
+        """一覧がHISTORY_MAX_ROWSを超えたら、表示範囲から遠い側の行を削除する
+
+        削除した範囲はIDを境界として覚えておき、スクロールで戻ったときに読み直す。
+        """
+        items = self.study_history_tree.get_children()
+        excess = len(items) - HISTORY_MAX_ROWS
+        if excess <= 0:
+            return
+        if from_top:
+            self.study_history_tree.delete(*items[:excess])
+            self.study_history_tree.yview_scroll(-excess, "units")  # 見ていた行が動かないように
+            self.history_newest_id = int(items[excess])
+        else:
+            self.study_history_tree.delete(*items[-excess:])
+            self.history_oldest_id = int(items[-excess - 1])
+            self.history_exhausted = False
+
+    def on_study_history_scroll(self, first, last):
+        """スクロール時のコールバック：端に近づいたら隣のページを先読みする"""
+        self.study_history_scrollbar.set(first, last)
+        if float(last) >= 1.0 - HISTORY_PREFETCH_MARGIN:
+            self.load_next_study_history_page()
+        if float(first) <= HISTORY_PREFETCH_MARGIN:
+            self.load_newer_study_history_page()
 
     def delete_study_history_callback(self):
         selected_item = self.study_history_tree.focus()
@@ -605,18 +831,21 @@ class StudyTimerApp:
 
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete the selected record?"):
             record_id = int(selected_item)
-            database.delete_study_record(record_id)
-            self.load_study_history()
-            self.update_progress_display()
+
+            def on_deleted(deleted):
+                self.remove_tree_item(self.study_history_tree, selected_item)
+                self.update_progress_display()
+            self.jobs.submit(database.delete_study_record, record_id, on_done=on_deleted)
 
     # --- Exam Goal Methods ---
     def load_exam_goals(self):
-        for item in self.goal_tree.get_children():
-            self.goal_tree.delete(item)
-        df = database.get_exam_goals()
-        for index, row in df.iterrows():
-            tags = (row['status'].replace(' ', ''),) # Create a tag from the status
-            self.goal_tree.insert("", "end", values=(row['id'], row['exam_date'], row['subject'], row['exam_name'], row['target_score'], row['status'], row['notes']), iid=row['id'], tags=tags)
+        """試験目標を読み込む（DB読み込みと整形はバックグラウンド、表示はUIスレッド）"""
+        self.jobs.submit(lambda: exam_goal_rows(database.fetch_exam_goals()), on_done=self.show_exam_goals)
+
+    def show_exam_goals(self, rows):
+        self.goal_tree.delete(*self.goal_tree.get_children())
+        for values, tags in rows:
+            self.goal_tree.insert("", "end", values=values, iid=values[0], tags=tags)
 
     def add_exam_goal_callback(self):
         subject = self.goal_subject_var.get()
@@ -632,21 +861,32 @@ class StudyTimerApp:
             messagebox.showwarning("Input Error", "Subject, Exam Name, and Target Score are required.")
             return
 
+        try:
+            if exam_date: database.to_day(exam_date)
+        except ValueError:
+            messagebox.showwarning("Input Error", "Exam Date must be in YYYY-MM-DD format.")
+            return
+
         try:
             if not target_score.isdigit(): raise ValueError("Target Score must be a number.")
         except ValueError as e:
             messagebox.showwarning("Input Error", str(e))
             return
 
-        database.add_exam_goal(subject, exam_name, exam_date, int(target_score), notes)
+        def on_saved(row):
+            self.goal_exam_name_entry.delete(0, tk.END)
+            self.goal_exam_date_entry.delete(0, tk.END)
+            self.goal_target_score_entry.delete(0, tk.END)
+            self.goal_notes_text.delete("1.0", tk.END)
 
-        self.goal_exam_name_entry.delete(0, tk.END)
-        self.goal_exam_date_entry.delete(0, tk.END)
-        self.goal_target_score_entry.delete(0, tk.END)
-        self.goal_notes_text.delete("1.0", tk.END)
+            # 一覧は試験日の昇順なので、該当位置に1行だけ挿入する
+            values, tags = exam_goal_item(row)
+            index = find_sorted_index(self.goal_tree, "Date", values[1])
+            self.goal_tree.insert("", index, values=values, iid=row[0], tags=tags)
+            messagebox.showinfo("Success", "Exam goal saved successfully.")
 
-        self.load_exam_goals()
-        messagebox.showinfo("Success", "Exam goal saved successfully.")
+        self.jobs.submit(database.add_exam_goal, subject, exam_name, exam_date, int(target_score), notes,
+                         on_done=on_saved)
 
     def update_goal_status_callback(self, status):
         selected_item = self.goal_tree.focus()
@@ -655,8 +895,14 @@ class StudyTimerApp:
             return
         
         goal_id = int(selected_item)
-        database.update_exam_goal_status(goal_id, status)
-        self.load_exam_goals()
+
+        def on_updated(row):
+            if row is None:
+                self.remove_tree_item(self.goal_tree, selected_item)  # 既に削除されていた
+            elif self.goal_tree.exists(selected_item):
+                values, tags = exam_goal_item(row)
+                self.goal_tree.item(selected_item, values=values, tags=tags)
+        self.jobs.submit(database.update_exam_goal_status, goal_id, status, on_done=on_updated)
 
     def delete_exam_goal_callback(self):
         selected_item = self.goal_tree.focus()
@@ -666,16 +912,18 @@ class StudyTimerApp:
 
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete the selected goal?"):
             goal_id = int(selected_item)
-            database.delete_exam_goal(goal_id)
-            self.load_exam_goals()
+            self.jobs.submit(database.delete_exam_goal, goal_id,
+                             on_done=lambda deleted: self.remove_tree_item(self.goal_tree, selected_item))
 
     # --- Study Goal Methods ---
     def load_study_goals(self):
-        for item in self.study_goals_tree.get_children():
-            self.study_goals_tree.delete(item)
-        df = database.get_goals()
-        for index, row in df.iterrows():
-            self.study_goals_tree.insert("", "end", values=(row['id'], row['goal_type'].capitalize(), row['subject'], row['target_minutes'], row['notes']), iid=row['id'])
+        """学習目標を読み込む（DB読み込みと整形はバックグラウンド、表示はUIスレッド）"""
+        self.jobs.submit(lambda: study_goal_rows(database.fetch_goals()), on_done=self.show_study_goals)
+
+    def show_study_goals(self, rows):
+        self.study_goals_tree.delete(*self.study_goals_tree.get_children())
+        for values in rows:
+            self.study_goals_tree.insert("", "end", values=values, iid=values[0])
 
     def set_study_goal_callback(self):
         goal_type = self.study_goal_type.get()
@@ -700,12 +948,21 @@ class StudyTimerApp:
         else: # weekly
             start_date = (today - timedelta(days=today.weekday())).strftime('%Y-%m-%d')
 
-        database.set_goal(goal_type, subject, start_date, minutes, notes)
-        self.study_goal_minutes_entry.delete(0, tk.END)
-        self.study_goal_notes_entry.delete(0, tk.END)
-        self.load_study_goals()
-        self.update_progress_display()
-        messagebox.showinfo("Success", "Study goal has been set successfully.")
+        def on_saved(row):
+            self.study_goal_minutes_entry.delete(0, tk.END)
+            self.study_goal_notes_entry.delete(0, tk.END)
+
+            # 既存の目標を更新した場合はその行だけ書き換え、新規なら開始日の新しい順の位置に挿入
+            values = study_goal_values(row)
+            if self.study_goals_tree.exists(row[0]):
+                self.study_goals_tree.item(row[0], values=values)
+            else:
+                index = find_sorted_index(self.study_goals_tree, "Start", row[3], descending=True)
+                self.study_goals_tree.insert("", index, values=values, iid=row[0])
+            self.update_progress_display()
+            messagebox.showinfo("Success", "Study goal has been set successfully.")
+
+        self.jobs.submit(database.set_goal, goal_type, subject, start_date, minutes, notes, on_done=on_saved)
 
     def delete_study_goal_callback(self):
         selected_item = self.study_goals_tree.focus()
@@ -715,16 +972,20 @@ class StudyTimerApp:
 
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete the selected goal?"):
             goal_id = int(selected_item)
-            database.delete_study_goal(goal_id)
-            self.load_study_goals()
-            self.update_progress_display()
+
+            def on_deleted(deleted):
+                self.remove_tree_item(self.study_goals_tree, selected_item)
+                self.update_progress_display()
+            self.jobs.submit(database.delete_study_goal, goal_id, on_done=on_deleted)
 
     def on_subject_change(self, *args):
         self.update_progress_display()
 
     def reset_ui(self):
-        if self.after_id: self.root.after_cancel(self.after_id); self.after_id = None
-        self.timer_running = False; self.is_paused = False; self.pomodoro_state = None
+        self.cancel_timer_tick()
+        if self.journal.session_id is not None:
+            self.journal.end("discarded", self.timer.studied())  # 保存されずに終わったセッション
+        self.timer = timer.Pomodoro() if self.pomodoro_mode.get() else timer.Stopwatch()
         
         for widget in self.button_frame.winfo_children(): widget.pack_forget()
         for widget in self.bottom_button_frame.winfo_children(): widget.pack_forget()
@@ -737,151 +998,164 @@ class StudyTimerApp:
         self.subject_menu.config(state="enabled")
         self.pomodoro_check.config(state="enabled")
         self.pomodoro_status_label.config(text="")
-        self.timer_label.config(text="25:00" if self.pomodoro_mode.get() else "00:00:00")
+        self.shown_seconds = None
+        self.update_timer_label()  # 通常: 00:00:00 / ポモドーロ: 25:00
         self.update_progress_display()
 
     def update_progress_display(self):
-        """日次目標の進捗表示を更新する関数"""
+        """日次目標の進捗表示を更新する関数（DB読み込みはバックグラウンドで実行）"""
         subject = self.selected_subject.get()  # 現在選択中の科目を取得
         self.goal_frame.config(text=f"Daily Goal Progress ({subject})")
+        self.progress_request += 1
+        request = self.progress_request
+        self.jobs.submit(self.fetch_daily_progress, subject,
+                         on_done=lambda result: self.show_progress(request, subject, result))
+
+    @staticmethod
+    def fetch_daily_progress(subject):
+        """ワーカースレッド側：選択科目の今日の目標と進捗を取得（なければ「全科目」目標）"""
         today = datetime.now().date()
-        
-        # 選択科目の今日の目標と進捗を取得
         target, progress = database.get_progress('daily', subject, today)
-
         if target is None:
             # 個別科目の目標がない場合、「全科目」目標をチェック
             target, progress = database.get_progress('daily', 'All', today)
-            if target is not None:
-                self.goal_frame.config(text="Daily Goal Progress (All Subjects)")
-            else:
-                # どちらの目標も設定されていない場合
-                self.goal_progress_label.config(text=f'No daily goal set for "{subject}" or "All".')
-                self.goal_progressbar['value'] = 0
-                self.goal_progressbar['maximum'] = 100
-                return
+            return 'All', target, progress
+        return subject, target, progress
+
+    def show_progress(self, request, subject, result):
+        """取得した進捗を表示する（UIスレッド）"""
+        if request != self.progress_request:
+            return  # より新しい更新が要求済み
+        goal_subject, target, progress = result
+
+        if target is None:
+            # どちらの目標も設定されていない場合
+            self.goal_progress_label.config(text=f'No daily goal set for "{subject}" or "All".')
+            self.goal_progressbar['value'] = 0
+            self.goal_progressbar['maximum'] = 100
+            return
+        if goal_subject == 'All':
+            self.goal_frame.config(text="Daily Goal Progress (All Subjects)")
 
         # 目標と現在の進捗を表示・更新
-        self.goal_progress_label.config(text=f"Daily Goal: {progress} / {target} minutes")
+        self.goal_progress_label.config(text=f"Daily Goal: {int(progress)} / {target} minutes")
         self.goal_progressbar['value'] = progress      # 現在の進捗
         self.goal_progressbar['maximum'] = target      # 目標値
 
-    def save_record(self, duration):
-        """学習記録をデータベースに保存する関数"""
-        minutes = int(duration.total_seconds() // 60)  # 秒を分に変換
+    def save_record(self, started_at, duration, session):
+        """学習記録をデータベースに保存する関数（開始時刻と秒単位の学習時間）
+
+        started_at は計測を開始した時刻。一時停止や停止から保存までの時間があっても
+        開始時刻（と日付）はずれない。
+
+        session は journal.detach() の戻り値。DBへのコミットが済んでから
+        ジャーナル上で「保存済み」にするので、保存前に終了しても次回起動時に復旧できる。
+        """
+        seconds = round(duration.total_seconds())  # 切り捨てずに秒単位で記録
         
-        if minutes == 0:
-            print("Study time was less than a minute, so it was not recorded.")  # 1分未満は記録しない
+        if seconds == 0:
+            print("Study time was less than a second, so it was not recorded.")
+            self.journal.close_session(session, "discarded", 0.0)
             return
             
-        # 今日の日付と選択科目で記録を保存
-        today_date = datetime.now().strftime('%Y-%m-%d')
+        # 開始時刻と選択科目で記録を保存
         subject = self.selected_subject.get()
-        database.add_record(today_date, subject, minutes)
-        
-        print(f"Record saved: {subject} - {minutes} minutes")  # コンソールに保存内容を表示
-        
-        # 進捗表示と履歴一覧を更新
-        self.update_progress_display()
-        self.load_study_history()
+
+        def on_saved(row):
+            self.journal.close_session(session, "saved", seconds)  # コミット済みになってから記録
+            print(f"Record saved: {subject} - {timer.format_clock(seconds)}")  # コンソールに保存内容を表示
+
+            # 進捗表示を更新し、履歴一覧の先頭（最新）に1行だけ追加
+            # （最新の記録を表示していないときは、上へスクロールしたときに読み込まれる）
+            self.update_progress_display()
+            if self.history_newest_id is None and not self.study_history_tree.exists(row[0]):
+                self.study_history_tree.insert("", 0, values=study_record_values(row), iid=row[0])
+                self.trim_study_history(from_top=False)
+        self.jobs.submit(database.add_session, started_at, subject, seconds, on_done=on_saved)
 
     def toggle_pomodoro_mode(self):
         self.reset_ui()
 
     def start_timer(self):
-        """タイマー開始（ポモドーロ/通常モードの切り替え）"""
-        if self.pomodoro_mode.get():
-            # ポモドーロモードの場合
-            self.pomodoro_cycles = 0  # サイクル数をリセット
-            self.start_pomodoro_work_session()  # 25分の作業セッション開始
-        else:
-            # 通常モードの場合
-            self.start_normal_timer()  # 自由な時間計測開始
-
-    def start_normal_timer(self):
-        if not self.timer_running:
-            self.timer_running = True
-            self.is_paused = False
-            self.start_time = datetime.now()
-            self.elapsed_time = timedelta(0)
-            self.update_normal_timer()
+        """タイマー開始（ポモドーロ/通常モードはreset_uiで選んだエンジンが担当）"""
+        if self.timer.start():
+            self.started_at = datetime.now()
+            self.journal.begin(self.selected_subject.get())
+            if self.pomodoro_mode.get():
+                self.pomodoro_status_label.config(text=self.timer.status())  # 作業中 (1/4)
+            self.update_timer_label()
+            self.schedule_timer_tick()
             self.update_ui_for_running_timer()
 
-    def update_normal_timer(self):
-        if self.timer_running and not self.is_paused:
-            current_elapsed = self.elapsed_time + (datetime.now() - self.start_time)
-            formatted_time = str(current_elapsed).split('.')[0]
-            self.timer_label.config(text=formatted_time)
-            self.after_id = self.root.after(1000, self.update_normal_timer)
-
-    def start_pomodoro_work_session(self):
-        self.pomodoro_state = "Work"
-        self.pomodoro_status_label.config(text=f"Work ({self.pomodoro_cycles + 1}/4)")
-        self.run_pomodoro_timer(25 * 60)
-
-    def start_pomodoro_break(self):
-        self.pomodoro_cycles += 1
-        if self.pomodoro_cycles % 4 == 0:
-            self.pomodoro_state = "Long Break"
-            self.pomodoro_status_label.config(text="Long Break")
-            self.run_pomodoro_timer(15 * 60)
-        else:
-            self.pomodoro_state = "Short Break"
-            self.pomodoro_status_label.config(text=f"Short Break ({self.pomodoro_cycles}/4)")
-            self.run_pomodoro_timer(5 * 60)
-
-    def run_pomodoro_timer(self, duration_seconds):
-        self.timer_running = True
-        self.end_time = datetime.now() + timedelta(seconds=duration_seconds)
-        self.update_pomodoro_timer()
-        self.update_ui_for_running_timer()
-
-    def update_pomodoro_timer(self):
-        if not self.timer_running: return
-        remaining = self.end_time - datetime.now()
-        if remaining.total_seconds() < 0:
+    def schedule_timer_tick(self):
+        """表示の秒が次に変わる瞬間（秒の境界）に合わせて次の更新を予約する"""
+        # 1000ms固定の間隔ではなく境界の直後（+1ms）に起きるので、表示がずれたり秒が飛んだりしない
+        delay_ms = int(self.timer.next_tick_delay() * 1000) + 1
+        self.after_id = self.root.after(delay_ms, self.on_timer_tick)
+
+    def cancel_timer_tick(self):
+        if self.after_id:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def on_timer_tick(self):
+        """タイマー更新：フェーズの終了を処理し、表示を更新して次を予約"""
+        self.after_id = None
+        finished = self.timer.tick()
+        if finished is not None:
             self.root.bell()
-            if self.pomodoro_state == "Work":
-                self.save_pomodoro_record()
-                self.start_pomodoro_break()
-            else: self.reset_ui()
-            return
-        formatted_time = f"{int(remaining.total_seconds() // 60):02d}:{int(remaining.total_seconds() % 60):02d}"
-        self.timer_label.config(text=formatted_time)
-        self.after_id = self.root.after(1000, self.update_pomodoro_timer)
+            if finished == timer.WORK:
+                # 作業終了：記録して休憩へ（休憩はエンジン側で開始済み）
+                work_seconds = self.timer.durations[timer.WORK]
+                self.save_pomodoro_record(work_seconds, self.journal.detach(work_seconds))
+                self.pomodoro_status_label.config(text=self.timer.status())
+            else:
+                self.reset_ui()  # 休憩終了でセッション終了
+                return
+        self.update_timer_label()
+        if self.shown_seconds % journal.CHECKPOINT_SECONDS == 0:
+            # 定期的に経過時間を記録（キューに積むだけなのでタイマーを遅らせない）
+            self.journal.record("checkpoint", self.timer.studied())
+        if self.timer.state == timer.RUNNING:
+            self.schedule_timer_tick()
+
+    def update_timer_label(self):
+        """表示する秒数が変わったときだけラベルを書き換える"""
+        seconds = self.timer.display_seconds()
+        if seconds != self.shown_seconds:
+            self.shown_seconds = seconds
+            self.timer_label.config(text=self.timer.format(seconds))
 
     def pause_timer(self):
-        if self.timer_running and not self.is_paused:
-            self.is_paused = True; self.timer_running = False
-            self.elapsed_time += datetime.now() - self.start_time
-            if self.after_id: self.root.after_cancel(self.after_id); self.after_id = None
+        if self.timer.pause():
+            self.journal.record("pause", self.timer.studied())
+            self.cancel_timer_tick()
             self.update_ui_for_paused_timer()
 
     def resume_timer(self):
-        if not self.timer_running and self.is_paused:
-            self.is_paused = False; self.timer_running = True
-            self.start_time = datetime.now()
-            self.update_normal_timer()
+        if self.timer.resume():
+            self.journal.record("resume", self.timer.studied())
+            self.schedule_timer_tick()
             self.update_ui_for_running_timer(is_resume=True)
 
     def stop_and_reset_all(self):
         if self.pomodoro_mode.get(): self.reset_ui()
-        else:
-            if self.timer_running or self.is_paused:
-                self.timer_running = False
-                if not self.is_paused: self.elapsed_time += datetime.now() - self.start_time
-                if self.after_id: self.root.after_cancel(self.after_id)
-                self.update_ui_for_stopped_timer()
+        elif self.timer.stop():
+            self.journal.record("stop", self.timer.studied())
+            self.cancel_timer_tick()
+            self.update_timer_label()
+            self.update_ui_for_stopped_timer()
 
     def save_and_reset(self):
-        self.save_record(self.elapsed_time)
+        session = self.journal.detach(self.timer.studied())
+        self.save_record(self.started_at, timedelta(seconds=self.timer.elapsed()), session)
         self.reset_ui()
 
     def discard_and_reset(self):
         self.reset_ui()
 
-    def save_pomodoro_record(self):
-        self.save_record(timedelta(minutes=25))
+    def save_pomodoro_record(self, work_seconds, session):
+        self.save_record(self.started_at, timedelta(seconds=work_seconds), session)
 
     def update_ui_for_running_timer(self, is_resume=False):
         if not is_resume: self.start_button.pack_forget(); self.bottom_button_frame.pack_forget()
@@ -901,11 +1175,367 @@ class StudyTimerApp:
         self.discard_button.pack(side="left", expand=True, padx=5)
 
     def open_analysis_window(self):
-        """学習データのグラフ分析ウィンドウを開く関数"""
-        show_analysis_window(self.root)  # visualize.pyの関数を呼び出し
+        """学習データのグラフ分析ウィンドウを開く関数（データ読み込みはバックグラウンド）"""
+        # visualize（matplotlib）の読み込みもワーカー側で行い、UIを止めない
+        self.jobs.submit(importlib.import_module, "visualize",
+                         on_done=lambda visualize: visualize.show_analysis_window(self.root, self.jobs))
+
+    # --- Import ---
+    def open_import_dialog(self, table):
+        """一括インポート用ダイアログを開く（取り込み処理はバックグラウンドで実行）"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Import")
+        dialog.transient(self.root)
+        dialog.resizable(False, False)
+
+        frame = ttk.Frame(dialog, padding=10)
+        frame.pack(fill="both", expand=True)
+        frame.columnconfigure(1, weight=1)
+
+        # 取り込み先テーブルの選択
+        ttk.Label(frame, text="Import into:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        target = tk.StringVar(value=table)
+        targets_frame = ttk.Frame(frame)
+        targets_frame.grid(row=0, column=1, columnspan=2, sticky="w")
+        ttk.Radiobutton(targets_frame, text="Study Records", variable=target,
+                        value="study_log").pack(side="left", padx=5)
+        ttk.Radiobutton(targets_frame, text="Mock Exam Results", variable=target,
+                        value="mock_exams").pack(side="left", padx=5)
+
+        # 取り込むファイルの選択
+        ttk.Label(frame, text="File:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        path_entry = ttk.Entry(frame, width=40)
+        path_entry.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+
+        def browse():
+            path = filedialog.askopenfilename(
+                parent=dialog,
+                filetypes=[("CSV / JSON Lines", "*.csv *.jsonl *.json"), ("All files", "*.*")])
+            if path:
+                path_entry.delete(0, tk.END)
+                path_entry.insert(0, path)
+        ttk.Button(frame, text="Browse...", command=browse).grid(row=1, column=2, padx=5, pady=5)
+
+        # 必要な列の説明
+        columns_label = ttk.Label(frame, foreground="gray")
+        columns_label.grid(row=2, column=0, columnspan=3, padx=5, sticky="w")
+        def show_columns(*args):
+            columns_label.config(text="Columns: " + ", ".join(importer.TABLES[target.get()][0]))
+        target.trace_add("write", show_columns)
+        show_columns()
+
+        status_label = ttk.Label(frame, text="")
+        status_label.grid(row=3, column=0, columnspan=3, padx=5, pady=5, sticky="w")
+        import_button = ttk.Button(frame, text="Import")
+        import_button.grid(row=4, column=0, columnspan=3, pady=5)
+
+        def on_imported(result):
+            # 取り込んだテーブルの一覧と進捗表示を読み直す
+            if result.imported:
+                self.load_subjects()  # 取り込んだ行に新しい科目があれば追加されている
+                if target.get() == "study_log":
+                    self.load_study_history()
+                    self.update_progress_display()
+                else:
+                    self.load_mock_exams()
+            message = f"Imported {result.imported:,} rows."
+            if result.rejected:
+                message += f"\n{result.rejected:,} rows were rejected; see {result.rejects_file}"
+            if dialog.winfo_exists():
+                dialog.destroy()
+            messagebox.showinfo("Import Finished", message)
+
+        def on_failed(error):
+            if dialog.winfo_exists():
+                import_button.config(state="normal")
+                status_label.config(text="")
+            messagebox.showerror("Import Error", f"Failed to import the file: {error}")
+
+        def start_import():
+            path = path_entry.get().strip()
+            if not path:
+                messagebox.showwarning("Input Error", "Please choose a file to import.", parent=dialog)
+                return
+            import_button.config(state="disabled")  # 取り込み中の二重実行を防ぐ
+            status_label.config(text="Importing...")
+            self.jobs.submit(importer.import_file, path, target.get(),
+                             on_done=on_imported, on_error=on_failed)
+        import_button.config(command=start_import)
+
+    # --- Subjects ---
+    def load_subjects(self, renamed=None):
+        """科目一覧をDBから読み直し、各タブの科目メニューを更新する"""
+        self.jobs.submit(database.fetch_subjects, on_done=lambda subjects: self.show_subjects(subjects, renamed))
+
+    def show_subjects(self, subjects, renamed=None):
+        """科目メニューを作り直す。選択中の科目は残し（名前変更後は新しい名前で）、消えた場合は先頭を選ぶ"""
+        self.subjects = [subject.name for subject in subjects]
+        renamed = renamed or {}
+        menus = (
+            (self.selected_subject, self.subject_menu, self.subjects),
+            (self.study_goal_subject, self.study_goal_subject_menu, [database.ALL_SUBJECTS] + self.subjects),
+            (self.goal_subject_var, self.goal_subject_menu, self.subjects),
+            (self.mock_selected_subject, self.mock_subject_menu, self.subjects),
+        )
+        for variable, menu, choices in menus:
+            current = renamed.get(variable.get(), variable.get())
+            if current not in choices:
+                current = choices[0] if choices else ""
+            menu.set_menu(current, *choices)
+
+    def open_subject_editor(self):
+        """科目の追加・名前変更・削除を行うダイアログ"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Subjects")
+        dialog.transient(self.root)
+        dialog.resizable(False, False)
+
+        frame = ttk.Frame(dialog, padding=10)
+        frame.pack(fill="both", expand=True)
+        frame.columnconfigure(0, weight=1)
+
+        # 科目一覧（Listboxと同じ順のSubject行をsubjectsに保持する）
+        listbox = tk.Listbox(frame, height=10, exportselection=False)
+        listbox.grid(row=0, column=0, columnspan=3, padx=5, pady=5, sticky="nsew")
+        subjects = []
+        name_entry = ttk.Entry(frame)
+        name_entry.grid(row=1, column=0, columnspan=3, padx=5, pady=5, sticky="ew")
+
+        def show(rows):
+            subjects[:] = rows
+            if dialog.winfo_exists():
+                listbox.delete(0, tk.END)
+                for subject in rows:
+                    listbox.insert(tk.END, subject.name)
+
+        def refresh(renamed=None):
+            def on_loaded(rows):
+                show(rows)
+                self.show_subjects(rows, renamed)
+            self.jobs.submit(database.fetch_subjects, on_done=on_loaded)
+
+        def on_select(event):
+            # 選択した科目名を入力欄へ（名前変更用）
+            selection = listbox.curselection()
+            if selection:
+                name_entry.delete(0, tk.END)
+                name_entry.insert(0, subjects[selection[0]].name)
+        listbox.bind("<<ListboxSelect>>", on_select)
+
+        def on_error(error):
+            messagebox.showwarning("Subjects", str(error), parent=dialog)
+
+        def entered_name():
+            try:
+                return database.validate_subject_name(name_entry.get())
+            except ValueError as e:
+                messagebox.showwarning("Input Error", str(e), parent=dialog)
+                return None
+
+        def selected_subject():
+            selection = listbox.curselection()
+            if not selection:
+                messagebox.showwarning("Selection Error", "Please select a subject.", parent=dialog)
+                return None
+            return subjects[selection[0]]
+
+        def add():
+            name = entered_name()
+            if name is not None:
+                self.jobs.submit(database.add_subject, name,
+                                 on_done=lambda subject: refresh(), on_error=on_error)
+
+        def rename():
+            subject, name = selected_subject(), entered_name()
+            if subject is None or name is None or name == subject.name:
+                return
+            def on_renamed(renamed):
+                refresh({subject.name: renamed.name})
+                # 一覧と進捗表示は科目名を表示しているので読み直す
+                self.reload_tables()
+                self.update_progress_display()
+            self.jobs.submit(database.rename_subject, subject.id, name,
+                             on_done=on_renamed, on_error=on_error)
+
+        def delete():
+            subject = selected_subject()
+            if subject is None:
+                return
+            if len(subjects) == 1:
+                messagebox.showwarning("Subjects", "At least one subject is required.", parent=dialog)
+                return
+            if messagebox.askyesno("Confirm Delete", f'Delete the subject "{subject.name}"?', parent=dialog):
+                # 記録・目標・模試で使われている科目はDB側で削除を拒否する
+                self.jobs.submit(database.delete_subject, subject.id,
+                                 on_done=lambda deleted: refresh(), on_error=on_error)
+
+        button_frame = ttk.Frame(frame)
+        button_frame.grid(row=2, column=0, columnspan=3, pady=5)
+        ttk.Button(button_frame, text="Add", command=add).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Rename", command=rename).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Delete", command=delete).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Close", command=dialog.destroy).pack(side="left", padx=5)
+        refresh()
+
+    # --- Profiles ---
+    def switch_profile(self, event=None):
+        """選択（または入力）されたプロファイルのDBに切り替え、全タブを読み直す"""
+        name = self.profile_var.get().strip()
+        if name == database.PROFILE:
+            return
+        try:
+            database.profile_path(name)  # 名前の検証のみ
+        except ValueError as e:
+            messagebox.showwarning("Profile", str(e))
+            self.profile_var.set(database.PROFILE)
+            return
+        if self.timer.state != timer.IDLE:
+            # 計測中のセッションは切り替え前のプロファイルに属する
+            messagebox.showwarning("Profile", "Save or discard the current session before switching profiles.")
+            self.profile_var.set(database.PROFILE)
+            return
+        if self.jobs.busy:
+            # 実行中のDB処理が新しいプロファイルのDBに書き込まないよう、完了を待ってもらう
+            messagebox.showinfo("Profile", "Please wait for the current task to finish, then switch again.")
+            self.profile_var.set(database.PROFILE)
+            return
+        if name not in database.list_profiles() and not messagebox.askyesno(
+                "Profile", f'Create a new profile "{name}"?'):
+            self.profile_var.set(database.PROFILE)
+            return
+        self.journal.flush()  # 前のプロファイルのイベントを書き終えてから切り替える
+        try:
+            # 実行中のDB処理がないことは確認済みなので、UIスレッドで直接切り替える
+            database.set_profile(name)
+        except Exception as e:
+            self.profile_var.set(database.PROFILE)
+            messagebox.showerror("Profile", f"Could not open profile {name}: {e}")
+            return
+        self.profile_menu.config(values=database.list_profiles())
+        self.update_title()
+        # 表示中のデータをすべて新しいプロファイルのもので読み直す
+        self.load_subjects()
+        self.reload_tables()
+        self.update_progress_display()
+        self.recover_unfinished_sessions()
+        if "visualize" in sys.modules:
+            sys.modules["visualize"].refresh_analysis_window()
 
+    def reload_tables(self):
+        """全タブの一覧を読み直す"""
+        self.load_mock_exams()
+        self.load_exam_goals()
+        self.load_study_goals()
+        self.load_study_history()
+
+    def update_title(self):
+        """ウィンドウタイトルに現在のプロファイル名を表示する（既定のプロファイルでは省略）"""
+        title = "Study Time Logger"
+        if database.PROFILE != database.DEFAULT_PROFILE:
+            title += f" - {database.PROFILE}"
+        self.root.title(title)
+
+    # --- Session Recovery ---
+    def recover_unfinished_sessions(self):
+        """前回の起動で保存も破棄もされなかったセッション（異常終了など）を探す"""
+        self.jobs.submit(self.load_unfinished_sessions, on_done=self.offer_session_recovery)
+
+    @staticmethod
+    def load_unfinished_sessions():
+        """ワーカースレッド側：終了済みセッションのイベントを削除し、未完了のものを返す"""
+        database.compact_session_events()
+        return database.get_unfinished_sessions()
+
+    def offer_session_recovery(self, sessions):
+        """未完了セッションごとに、学習記録として保存するかを確認する"""
+        decisions = []
+        for session in sessions:
+            seconds = round(session.elapsed)
+            started = datetime.fromtimestamp(session.started_at)
+            save = seconds > 0 and messagebox.askyesno(
+                "Recover Session",
+                f"An unfinished {session.subject} session from {started.strftime('%Y-%m-%d %H:%M')} "
+                f"({timer.format_clock(seconds)}) was found.\nSave it to your study log?")
+            decisions.append((session, save))
+        if decisions:
+            self.jobs.submit(self.resolve_sessions, decisions, on_done=self.on_sessions_resolved)
+
+    @staticmethod
+    def resolve_sessions(decisions):
+        """ワーカースレッド側：選ばれたセッションを保存し、すべてを終了済みにする"""
+        saved = 0
+        closing_events = []
+        for session, save in decisions:
+            save = save and round(session.elapsed) > 0  # 1秒未満は記録できないので破棄扱い
+            if save:
+                database.add_session(datetime.fromtimestamp(session.started_at),
+                                     session.subject, session.elapsed)
+                saved += 1
+            closing_events.append((session.session_id, "saved" if save else "discarded",
+                                   time.time(), session.elapsed, session.subject))
+        database.append_session_events(closing_events)
+        database.compact_session_events()
+        return saved
+
+    def on_sessions_resolved(self, saved):
+        if saved:
+            self.load_study_history()
+            self.update_progress_display()
+
+    # --- Background Jobs ---
+    def remove_tree_item(self, tree, iid):
+        """一覧から1行削除する（既に消えていれば何もしない）"""
+        if tree.exists(iid):
+            tree.delete(iid)
+
+    def on_jobs_busy_change(self, busy):
+        """バックグラウンド処理の実行中はステータスバーに進捗を表示する"""
+        if busy:
+            self.status_label.config(text="Working...")
+            self.status_progressbar.pack(side="right")
+            self.status_progressbar.start(15)
+        else:
+            self.status_progressbar.stop()
+            self.status_progressbar.pack_forget()
+            self.status_label.config(text="")
+
+    def on_close(self):
+        """終了時：待ち行列のものも含めてDB処理をすべて完了させてからウィンドウを閉じる"""
+        if self.journal.session_id is not None:
+            # 計測中のセッションは未完了のまま残し、次回起動時に復旧できるようにする
+            self.journal.record("checkpoint", self.timer.studied())
+        # 保存ジョブのコールバック（ジャーナルの「保存済み」記録）まで実行してからジャーナルを閉じる
+        self.jobs.shutdown()
+        self.journal.close()
+        self.root.destroy()
+
+def main():
+    parser = argparse.ArgumentParser(description="Study Time Logger")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="report import time and time-to-first-paint on stdout")
+    parser.add_argument("--profile", default=database.DEFAULT_PROFILE,
+                        help="profile (student) to open")
+    args = parser.parse_args()
+    try:
+        database.profile_path(args.profile)
+    except ValueError as e:
+        parser.error(str(e))
 
-if __name__ == "__main__":
     root = tk.Tk()
-    app = StudyTimerApp(root)
+    app = StudyTimerApp(root, args.profile)
+
+    if args.profile_startup:
+        root.update()  # 最初の描画を完了させてから計測
+        first_paint = time.perf_counter()
+        print(f"[startup] imports: {(_IMPORTS_DONE - _MODULE_START) * 1000:.1f} ms")
+        print(f"[startup] time to first paint: {(first_paint - _MODULE_START) * 1000:.1f} ms")
+        warm_up_modules(lambda seconds: print(
+            f"[startup] background warm-up of {', '.join(DEFERRED_MODULES)}: {seconds * 1000:.1f} ms"))
+    else:
+        # ウィンドウが表示されてから重いモジュールを先読みする
+        root.after_idle(warm_up_modules)
     root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
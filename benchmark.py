@@ -0,0 +1,728 @@
+"""Performance benchmarks for the study app.
+
+Every benchmark runs against a throwaway database in a temporary directory, so
+the real study_log.db is never touched.
+
+Usage:
+    python benchmark.py add_record [-n 10000]
+    python benchmark.py progress [--sizes 10000 100000 1000000]
+    python benchmark.py row_format [-n 100000]
+    python benchmark.py load_api [-n 100000]
+    python benchmark.py report [--sizes 10000 100000 1000000 3000000]
+    python benchmark.py query_plans
+    python benchmark.py history_page [--sizes 10000 100000 1000000]
+    python benchmark.py report_stream [--sizes 10000 100000 1000000] [--memory]
+    python benchmark.py import [-n 1000000]
+    python benchmark.py export [-n 1000000] [--memory]
+    python benchmark.py chart [--years 1 5 20]
+    python benchmark.py journal [-n 10000]
+    python benchmark.py storage [-n 1000000]
+    python benchmark.py profiles [--counts 1 10 100] [--rows 10000]
+    python benchmark.py write_behind [-n 20000] [--threads 8] [--synchronous NORMAL|FULL]
+    python benchmark.py query_cache [-n 1000] [--rows 100000] [--tab-rows 200]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+
+import database
+
+
+@contextmanager
+def temp_database(name="bench.db"):
+    """Points database.DB_FILE at a fresh temporary file for the duration of the block."""
+    original = database.DB_FILE
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database.DB_FILE = os.path.join(tmp_dir, name)
+        try:
+            database.init_db()
+            yield database.DB_FILE
+        finally:
+            database.close_connections()
+            database.DB_FILE = original
+
+
+def report(label, count, seconds, unit="ops"):
+    rate = count / seconds if seconds else float("inf")
+    print(f"{label:<44} {count:>9} {unit} in {seconds * 1000:10.2f} ms  ({rate:,.0f} {unit}/s)")
+
+
+# --- add_record: connection-per-call vs pooled connection ---
+
+def _legacy_add_record(db_file, date, subject, minutes):
+    """The original add_record: a fresh connection and commit for every row."""
+    with sqlite3.connect(db_file) as conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO study_log (date, subject, minutes) VALUES (?, ?, ?)",
+                       (date, subject, minutes))
+        conn.commit()
+    conn.close()
+
+
+def bench_add_record(args):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # The original schema, in the default rollback-journal mode it ran in
+        db_file = os.path.join(tmp_dir, "legacy.db")
+        with sqlite3.connect(db_file) as conn:
+            conn.execute("""
+                CREATE TABLE study_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    date TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    minutes INTEGER NOT NULL
+                )
+            """)
+        conn.close()
+        start = time.perf_counter()
+        for i in range(args.n):
+            _legacy_add_record(db_file, "2024-01-01", "Math", i % 120 + 1)
+        report("add_record (connect per call)", args.n, time.perf_counter() - start, "rows")
+
+    with temp_database("pooled.db"):
+        start = time.perf_counter()
+        for i in range(args.n):
+            database.add_record("2024-01-01", "Math", i % 120 + 1)
+        report("add_record (pooled connection)", args.n, time.perf_counter() - start, "rows")
+
+
+# --- history_page: first page of the history tab vs loading every record ---
+
+def _fill_study_log(rows, subjects=("Math", "English", "Physics", "Chemistry"), last_date="2024-01-01"):
+    """Bulk-inserts `rows` synthetic sessions, eight per day, ending on last_date."""
+    base_day = database.to_day(last_date)
+    ids = database.get_subject_ids(subjects)
+    subject_ids = [ids[subject] for subject in subjects]
+    conn = database.get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO study_log (day, start, subject_id, seconds) VALUES (?, ?, ?, ?)",
+            ((base_day - i // 8, 28_800 + i % 8 * 5_400, subject_ids[i % len(subject_ids)],
+              i * 37 % 7_200 + 1) for i in range(rows)))
+
+
+def bench_history_page(args):
+    for size in args.sizes:
+        with temp_database():
+            _fill_study_log(size)
+            start = time.perf_counter()
+            database.get_records_page(None, 100)
+            report(f"first history page ({size:,} rows)", 1, time.perf_counter() - start, "pages")
+            start = time.perf_counter()
+            database.get_all_records()
+            report(f"get_all_records ({size:,} rows)", 1, time.perf_counter() - start, "loads")
+
+
+# --- progress: get_progress from the daily_totals rollup ---
+
+def bench_progress(args):
+    today = date(2024, 1, 1)
+    for size in args.sizes:
+        with temp_database():
+            _fill_study_log(size)
+            database.set_goal('weekly', 'All', '2023-12-25', 600, '')
+            conn = database.get_connection()
+            start = time.perf_counter()
+            for _ in range(args.n):
+                conn.execute("SELECT SUM(seconds) FROM study_log WHERE day BETWEEN ? AND ?",
+                             (database.to_day('2023-12-25'), database.to_day('2023-12-31'))).fetchone()
+            report(f"raw SUM over study_log ({size:,} rows)", args.n, time.perf_counter() - start, "calls")
+            start = time.perf_counter()
+            for _ in range(args.n):
+                # The query itself; repeated calls through get_progress() would hit the query cache
+                database.get_progress.__wrapped__('weekly', 'All', today)
+            report(f"get_progress weekly All ({size:,} rows)", args.n, time.perf_counter() - start, "calls")
+
+
+# --- row_format: Treeview row rendering, iterrows vs the vectorized pipeline ---
+
+def _legacy_mock_exam_rows(df):
+    import pandas as pd
+    rows = []
+    for index, row in df.iterrows():
+        rows.append((row['id'], row['date'], row['subject'], row['exam_name'],
+                     '' if pd.isna(row['score']) else int(row['score']),
+                     '' if pd.isna(row['max_score']) else int(row['max_score']),
+                     '' if pd.isna(row['deviation_value']) else row['deviation_value']))
+    return rows
+
+
+def _legacy_exam_goal_rows(df):
+    return [((row['id'], row['exam_date'], row['subject'], row['exam_name'], row['target_score'],
+              row['status'], row['notes']), (row['status'].replace(' ', ''),))
+            for index, row in df.iterrows()]
+
+
+def _legacy_study_goal_rows(df):
+    return [(row['id'], row['goal_type'].capitalize(), row['subject'], row['target_minutes'],
+             row['notes'], row['start_date'])
+            for index, row in df.iterrows()]
+
+
+def _fill_tab_tables(n):
+    """Inserts n synthetic rows into each of goals, mock_exams and mock_exam_goals."""
+    base_day = database.to_day("2024-01-01")
+    math = database.get_subject_ids(["Math"])["Math"]
+    conn = database.get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO mock_exams (day, subject_id, exam_name, score, max_score, deviation_value) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            ((base_day - i, math, "Mock", None if i % 5 == 0 else i % 100,
+              None if i % 7 == 0 else 100, None if i % 3 == 0 else 50.5) for i in range(n)))
+        conn.executemany(
+            "INSERT INTO mock_exam_goals (subject_id, exam_name, exam_day, target_score, status, notes) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            ((math, "Final", base_day + i, 80, ("Active", "Achieved", "Not Achieved")[i % 3],
+              None if i % 2 else "note") for i in range(n)))
+        conn.executemany(
+            "INSERT INTO goals (goal_type, subject_id, start_day, target_minutes, notes) VALUES (?, ?, ?, ?, ?)",
+            ((("daily", "weekly")[i % 2], math, base_day - i, 60, None if i % 2 else "note")
+             for i in range(n)))
+
+
+def bench_row_format(args):
+    import app
+
+    with temp_database():
+        _fill_tab_tables(args.n)
+        tabs = [
+            ("mock exams", database.get_mock_exams, _legacy_mock_exam_rows,
+             database.fetch_mock_exams, app.mock_exam_rows),
+            ("exam goals", database.get_exam_goals, _legacy_exam_goal_rows,
+             database.fetch_exam_goals, app.exam_goal_rows),
+            ("study goals", database.get_goals, _legacy_study_goal_rows,
+             database.fetch_goals, app.study_goal_rows),
+        ]
+        for label, get_frame, legacy, fetch_rows, to_rows in tabs:
+            start = time.perf_counter()
+            legacy(get_frame())
+            report(f"{label}: DataFrame + iterrows", args.n, time.perf_counter() - start, "rows")
+            start = time.perf_counter()
+            to_rows(fetch_rows())
+            report(f"{label}: cursor rows", args.n, time.perf_counter() - start, "rows")
+
+
+# --- load_api: cold import and per-load memory of the row API vs DataFrames ---
+
+def bench_load_api(args):
+    import subprocess
+    import tracemalloc
+
+    probe = ("import sys, time; start = time.perf_counter(); import database; "
+             "print(f'{(time.perf_counter() - start) * 1000:.1f} ms', 'pandas' in sys.modules)")
+    output = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+    print(f"cold 'import database': {output[0]} ms, pandas loaded: {output[2]}")
+
+    with temp_database():
+        _fill_study_log(args.n)
+        for label, load in (("get_all_records (DataFrame)", database.get_all_records),
+                            ("fetch_records (rows)", database.fetch_records)):
+            tracemalloc.start()
+            start = time.perf_counter()
+            result = load()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            del result
+            report(label, args.n, elapsed, "rows")
+            print(f"{'':<44} peak memory {peak / 1024 / 1024:.1f} MiB")
+
+
+# --- report: weekly report time as the history grows ---
+
+def bench_report(args):
+    import report_generator
+
+    cwd = os.getcwd()
+    for size in args.sizes:
+        with temp_database() as db_file:
+            _fill_study_log(size, last_date=date.today())
+            os.chdir(os.path.dirname(db_file))  # the PDF is written to the cwd
+            try:
+                start = time.perf_counter()
+                report_generator.generate_weekly_report()
+                report(f"generate_weekly_report ({size:,} rows)", 1, time.perf_counter() - start, "reports")
+            finally:
+                os.chdir(cwd)
+
+
+# --- report_stream: all-time report throughput and memory ---
+
+def bench_report_stream(args):
+    import tracemalloc
+    import report_generator
+
+    cwd = os.getcwd()
+    for size in args.sizes:
+        with temp_database() as db_file:
+            _fill_study_log(size, last_date=date.today())
+            os.chdir(os.path.dirname(db_file))  # the PDF is written to the cwd
+            try:
+                if args.memory:
+                    tracemalloc.start()
+                start = time.perf_counter()
+                filename = report_generator.generate_all_time_report()
+                elapsed = time.perf_counter() - start
+                report(f"generate_all_time_report ({size:,} rows)", size, elapsed, "rows")
+                if args.memory:
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    print(f"{'':<44} peak Python memory {peak / 1e6:8.1f} MB, "
+                          f"PDF {os.path.getsize(filename) / 1e6:.1f} MB")
+            finally:
+                os.chdir(cwd)
+
+
+# --- import: bulk CSV import vs one add_record call per row ---
+
+def bench_import(args):
+    import csv
+    import importer
+
+    subjects = ("Math", "English", "Physics", "Chemistry")
+    with temp_database() as db_file:
+        path = os.path.join(os.path.dirname(db_file), "records.csv")
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("date", "start_time", "subject", "seconds"))
+            for i in range(args.n):
+                writer.writerow((f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}", f"{8 + i % 12:02d}:30:00",
+                                 subjects[i % 4], i * 37 % 7_200 + 1))
+
+        start = time.perf_counter()
+        result = importer.import_file(path, "study_log")
+        report(f"importer.import_file ({args.n:,} rows)", result.imported,
+               time.perf_counter() - start, "rows")
+
+        sample = min(args.n, 2_000)
+        start = time.perf_counter()
+        for i in range(sample):
+            database.add_record("2024-01-01", subjects[i % 4], 30)
+        report("add_record per row (sample)", sample, time.perf_counter() - start, "rows")
+
+
+# --- export: streaming export throughput per format ---
+
+def bench_export(args):
+    import tracemalloc
+    import exporter
+
+    formats = [fmt for fmt in exporter.FORMATS if fmt != "parquet" or exporter.PARQUET_AVAILABLE]
+    if not exporter.PARQUET_AVAILABLE:
+        print("(pyarrow is not installed; skipping parquet)")
+    with temp_database() as db_file:
+        _fill_study_log(args.n)
+        for fmt in formats:
+            path = os.path.join(os.path.dirname(db_file), f"study_log.{fmt}")
+            if args.memory:
+                tracemalloc.start()
+            start = time.perf_counter()
+            count = exporter.export_table("study_log", path)
+            report(f"export study_log to {fmt}", count, time.perf_counter() - start, "rows")
+            if args.memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f"{'':<44} peak Python memory {peak / 1e6:8.1f} MB, "
+                      f"file {os.path.getsize(path) / 1e6:.1f} MB")
+
+
+# --- chart: analysis time chart render cost as the history grows ---
+
+def bench_chart(args):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import visualize
+
+    for years in args.years:
+        with temp_database():
+            _fill_study_log(years * 365 * 8, last_date=date.today())
+
+            # Before: every record into pandas, one categorical bar per date
+            fig = Figure(figsize=(12, 5))
+            FigureCanvasAgg(fig)
+            start = time.perf_counter()
+            df = database.get_records_between(None, None)
+            df.groupby('date')['seconds'].sum().plot(kind='bar', ax=fig.subplots())
+            fig.canvas.draw()
+            report(f"per-date bars ({years} years)", 1, time.perf_counter() - start, "renders")
+
+            # After: SQL buckets from daily_totals, at most MAX_BARS bars
+            fig = Figure(figsize=(12, 5))
+            FigureCanvasAgg(fig)
+            start = time.perf_counter()
+            data = visualize.load_period(None)
+            visualize.draw_buckets(fig.subplots(), data.bucket, data.bucket_totals)
+            fig.canvas.draw()
+            report(f"{data.bucket} buckets, {len(data.bucket_totals)} bars ({years} years)", 1,
+                   time.perf_counter() - start, "renders")
+
+
+# --- journal: cost of a timer event on the UI thread ---
+
+def bench_journal(args):
+    import journal
+
+    with temp_database():
+        # Before (what a naive journal would do): one INSERT + commit per event
+        conn = database.get_connection()
+        start = time.perf_counter()
+        for i in range(args.n):
+            with conn:
+                conn.execute("INSERT INTO session_events (session_id, event, at, elapsed, subject) "
+                             "VALUES (1, 'checkpoint', ?, ?, 'Math')", (time.time(), float(i)))
+        report("insert + commit per event", args.n, time.perf_counter() - start, "events")
+
+        # After: the timer only enqueues; the writer thread group-commits
+        session_journal = journal.SessionJournal()
+        session_journal.begin("Math")
+        start = time.perf_counter()
+        for i in range(args.n):
+            session_journal.record("checkpoint", float(i))
+        report("SessionJournal.record (UI thread)", args.n, time.perf_counter() - start, "events")
+        start = time.perf_counter()
+        session_journal.close()
+        report("  ...until all committed", args.n, time.perf_counter() - start, "events")
+
+
+# --- storage: on-disk size of study_log, its index and the rollup ---
+
+def _table_sizes(conn, names):
+    """Returns {table or index name: bytes} from the dbstat virtual table."""
+    placeholders = ", ".join("?" * len(names))
+    return dict(conn.execute(f"SELECT name, SUM(pgsize) FROM dbstat WHERE name IN ({placeholders}) "
+                             "GROUP BY name", names).fetchall())
+
+
+def bench_storage(args):
+    with temp_database():
+        _fill_study_log(args.n)
+        conn = database.get_connection()
+        # For comparison: the same sessions with the subject name on every row
+        # (the layout before the subjects table)...
+        with conn:
+            conn.execute("CREATE TABLE study_log_names (id INTEGER PRIMARY KEY, day INTEGER NOT NULL, "
+                         "start INTEGER, subject TEXT NOT NULL, seconds INTEGER NOT NULL)")
+            conn.execute("INSERT INTO study_log_names (id, day, start, subject, seconds) "
+                         "SELECT l.id, l.day, l.start, s.name, l.seconds "
+                         "FROM study_log AS l JOIN subjects AS s ON s.id = l.subject_id")
+            conn.execute("CREATE INDEX idx_study_log_names ON study_log_names (day, subject, seconds)")
+            conn.execute("CREATE TABLE daily_totals_names (day INTEGER NOT NULL, subject TEXT NOT NULL, "
+                         "seconds INTEGER NOT NULL, PRIMARY KEY (day, subject)) WITHOUT ROWID")
+            conn.execute("INSERT INTO daily_totals_names (day, subject, seconds) "
+                         "SELECT t.day, s.name, t.seconds "
+                         "FROM daily_totals AS t JOIN subjects AS s ON s.id = t.subject_id")
+        # ...and as an ISO start timestamp, the subject name and REAL seconds
+        with conn:
+            conn.execute("CREATE TABLE study_log_text (id INTEGER PRIMARY KEY, started_at TEXT NOT NULL, "
+                         "subject TEXT NOT NULL, seconds REAL NOT NULL)")
+            conn.execute("INSERT INTO study_log_text (id, started_at, subject, seconds) "
+                         "SELECT l.id, datetime(l.day * 86400 + l.start, 'unixepoch'), s.name, l.seconds + 0.0 "
+                         "FROM study_log AS l JOIN subjects AS s ON s.id = l.subject_id")
+            conn.execute("CREATE INDEX idx_study_log_text ON study_log_text (started_at, subject, seconds)")
+        conn.execute("VACUUM")  # pack every b-tree, so page fill does not skew the comparison
+        sizes = _table_sizes(conn, ["study_log", "idx_study_log_day_subject", "daily_totals",
+                                    "study_log_names", "idx_study_log_names", "daily_totals_names",
+                                    "study_log_text", "idx_study_log_text"])
+        for name, size in sizes.items():
+            print(f"{name:<44} {size / 1024 / 1024:8.1f} MiB  {size / args.n:6.1f} bytes/row")
+
+
+# --- profiles: one student's lookups as the number of profiles grows ---
+
+def bench_profiles(args):
+    today = date(2024, 1, 1)
+    original = database.PROFILES_DIR, database.DB_FILE, database.PROFILE
+    for count in args.counts:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            database.PROFILES_DIR = tmp_dir
+            try:
+                for i in range(count):
+                    database.set_profile(f"student{i}")
+                    _fill_study_log(args.rows)
+                    database.set_goal('weekly', 'All', '2023-12-25', 600, '')
+                start = time.perf_counter()
+                for i in range(args.n):
+                    database.set_profile(f"student{i % count}")
+                    # Uncached, so every lookup reaches the profile's database
+                    database.get_progress.__wrapped__('weekly', 'All', today)
+                    database.get_records_page.__wrapped__(None, 100)
+                report(f"switch + progress + page ({count} profiles)", args.n,
+                       time.perf_counter() - start, "lookups")
+            finally:
+                database.close_connections()
+                database.PROFILES_DIR, database.DB_FILE, database.PROFILE = original
+
+
+# --- write_behind: one commit per insert vs group commit ---
+
+def _run_threads(threads, target):
+    workers = [threading.Thread(target=target, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def bench_write_behind(args):
+    from datetime import datetime
+
+    started_at = datetime(2024, 1, 1, 9, 0, 0)
+    per_thread = args.n // args.threads
+    # FULL fsyncs on every commit (the app's NORMAL only does at checkpoints)
+    original_pragmas = database.CONNECTION_PRAGMAS
+    database.CONNECTION_PRAGMAS = tuple(
+        f"PRAGMA synchronous={args.synchronous}" if pragma.startswith("PRAGMA synchronous") else pragma
+        for pragma in original_pragmas)
+    try:
+        _bench_write_behind(args, started_at, per_thread)
+    finally:
+        database.CONNECTION_PRAGMAS = original_pragmas
+
+
+def _bench_write_behind(args, started_at, per_thread):
+    with temp_database():
+        start = time.perf_counter()
+        for i in range(args.n):
+            database.add_session(started_at, "Math", i % 3600 + 1)
+        report("add_session, commit per row", args.n, time.perf_counter() - start, "rows")
+
+        def insert_direct(_):
+            for i in range(per_thread):
+                database.add_session(started_at, "Math", i % 3600 + 1)
+        start = time.perf_counter()
+        _run_threads(args.threads, insert_direct)
+        report(f"add_session, {args.threads} threads", per_thread * args.threads,
+               time.perf_counter() - start, "rows")
+
+        write_queue = database.WriteBehindQueue("async")
+        start = time.perf_counter()
+        for i in range(args.n):
+            write_queue.add_session(started_at, "Math", i % 3600 + 1)
+        write_queue.flush()
+        report("WriteBehindQueue async (until committed)", args.n, time.perf_counter() - start, "rows")
+        write_queue.close()
+
+        write_queue = database.WriteBehindQueue("sync")
+        def insert_queued(_):
+            for i in range(per_thread):
+                write_queue.add_session(started_at, "Math", i % 3600 + 1)
+        start = time.perf_counter()
+        _run_threads(args.threads, insert_queued)
+        report(f"WriteBehindQueue sync, {args.threads} threads", per_thread * args.threads,
+               time.perf_counter() - start, "rows")
+        write_queue.close()
+
+
+# --- query_cache: repeated reads, uncached vs served from the query cache ---
+
+def bench_query_cache(args):
+    from datetime import datetime
+
+    today = date(2024, 1, 1)
+    with temp_database():
+        _fill_study_log(args.rows, last_date=today.isoformat())
+        _fill_tab_tables(args.tab_rows)
+        database.set_goal('daily', 'Math', today.isoformat(), 60, '')
+        reads = [
+            ("get_goals (DataFrame)", database.get_goals, ()),
+            ("get_exam_goals (DataFrame)", database.get_exam_goals, ()),
+            ("get_mock_exams (DataFrame)", database.get_mock_exams, ()),
+            ("fetch_goals", database.fetch_goals, ()),
+            ("fetch_exam_goals", database.fetch_exam_goals, ()),
+            ("fetch_mock_exams", database.fetch_mock_exams, ()),
+            ("fetch_subjects", database.fetch_subjects, ()),
+            ("get_progress daily subject", database.get_progress, ('daily', 'Math', today)),
+        ]
+        for label, read, read_args in reads:
+            start = time.perf_counter()
+            for _ in range(args.n):
+                read.__wrapped__(*read_args)
+            report(f"{label}, uncached", args.n, time.perf_counter() - start, "calls")
+            start = time.perf_counter()
+            for _ in range(args.n):
+                read(*read_args)
+            report(f"{label}, cached", args.n, time.perf_counter() - start, "calls")
+
+        # A write between reads bumps the table version, so every read misses
+        started_at = datetime(2024, 1, 1, 9, 0, 0)
+        start = time.perf_counter()
+        for i in range(args.n):
+            database.add_session(started_at, "Math", i % 3600 + 1)
+            database.get_progress('daily', 'Math', today)
+        report("add_session + get_progress (all misses)", args.n, time.perf_counter() - start, "pairs")
+        print(database.query_cache_stats())
+
+
+# --- query_plans: every hot query must be answered from an index ---
+
+def hot_queries():
+    """The read paths that run on every click, as (label, callable, lists_table).
+
+    lists_table marks the reads that return a whole table (every goal, every
+    subject): they may walk an index from end to end. Every other read must
+    only search the range it asks for.
+    """
+    today = date(2024, 1, 10)
+    return [
+        ("get_progress daily subject", lambda: database.get_progress('daily', 'Math', today), False),
+        ("fetch_subjects", database.fetch_subjects, True),
+        ("get_progress weekly All", lambda: database.get_progress('weekly', 'All', today), False),
+        ("get_records_page older", lambda: database.get_records_page(500, 100), False),
+        ("get_records_page newer", lambda: database.get_records_page(None, 100, after_id=500), False),
+        ("get_records_between week", lambda: database.get_records_between(date(2024, 1, 4), today), False),
+        ("get_records_between week, one subject",
+         lambda: database.get_records_between(date(2024, 1, 4), today, ["Math"]), False),
+        ("iter_records_between month",
+         lambda: list(database.iter_records_between(date(2023, 12, 11), today)), False),
+        ("iter_table_chunks mock_exams month",
+         lambda: list(database.iter_table_chunks("mock_exams", date(2023, 12, 11), today)), False),
+        ("iter_table_chunks mock_exam_goals", lambda: list(database.iter_table_chunks("mock_exam_goals")), True),
+        ("get_daily_totals month", lambda: database.get_daily_totals(date(2023, 12, 11), today), False),
+        ("get_goals", database.get_goals, True),
+        ("get_mock_exams", database.get_mock_exams, True),
+        ("get_exam_goals", database.get_exam_goals, True),
+    ]
+
+
+def seed_hot_query_data():
+    """Fills the current database with enough rows of every kind for hot_queries()."""
+    _fill_study_log(2_000, last_date="2024-01-10")
+    database.set_goal('daily', 'Math', '2024-01-10', 60, '')
+    database.set_goal('weekly', 'All', '2024-01-08', 600, '')
+    for i in range(20):
+        database.add_mock_exam(f"2024-01-{i + 1:02d}", "Math", f"Exam {i}", 60 + i, 100, 50.0 + i)
+        database.add_exam_goal("Math", f"Exam {i}", f"2024-02-{i + 1:02d}", 80, "")
+
+
+def query_plans(query):
+    """Runs query() with an empty query cache and returns [(sql, plan steps)]
+    for each SELECT it ran."""
+    conn = database.get_connection()
+    database.clear_query_cache()  # a cached read would run no SQL to check
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        query()
+    finally:
+        conn.set_trace_callback(None)
+    return [(sql, [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)])
+            for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+
+
+def bad_plan_steps(plan, lists_table=False):
+    """Returns the plan steps that read a table without an index, scan a whole
+    index (unless lists_table) or sort in a temp b-tree."""
+    bad = []
+    for step in plan:
+        if "TEMP B-TREE" in step:
+            bad.append(step)
+        elif step.startswith("SCAN") and ("INDEX" not in step or not lists_table):
+            bad.append(step)
+    return bad
+
+
+def check_query_plans(args):
+    failures = 0
+    with temp_database():
+        seed_hot_query_data()
+        for label, query, lists_table in hot_queries():
+            for sql, plan in query_plans(query):
+                bad = bad_plan_steps(plan, lists_table)
+                status = "FAIL" if bad else "ok"
+                failures += bool(bad)
+                print(f"[{status}] {label}: {' | '.join(plan)}")
+    if failures:
+        print(f"{failures} hot queries do not use an index")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("add_record", help="10k add_record calls, before and after pooling")
+    p.add_argument("-n", type=int, default=10_000)
+    p.set_defaults(func=bench_add_record)
+
+    p = subparsers.add_parser("history_page", help="history tab startup cost as study_log grows")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    p.set_defaults(func=bench_history_page)
+
+    p = subparsers.add_parser("progress", help="weekly progress lookups as study_log grows")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    p.add_argument("-n", type=int, default=1_000)
+    p.set_defaults(func=bench_progress)
+
+    p = subparsers.add_parser("row_format", help="loading and formatting each tab's Treeview rows")
+    p.add_argument("-n", type=int, default=100_000)
+    p.set_defaults(func=bench_row_format)
+
+    p = subparsers.add_parser("load_api", help="import time and load memory, rows vs DataFrames")
+    p.add_argument("-n", type=int, default=100_000)
+    p.set_defaults(func=bench_load_api)
+
+    p = subparsers.add_parser("report", help="weekly report time as study_log grows")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000, 3_000_000])
+    p.set_defaults(func=bench_report)
+
+    p = subparsers.add_parser("report_stream", help="all-time report throughput in rows/s")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    p.add_argument("--memory", action="store_true", help="also trace peak Python memory (slower)")
+    p.set_defaults(func=bench_report_stream)
+
+    p = subparsers.add_parser("import", help="bulk CSV import throughput in rows/s")
+    p.add_argument("-n", type=int, default=1_000_000)
+    p.set_defaults(func=bench_import)
+
+    p = subparsers.add_parser("export", help="streaming export throughput in rows/s")
+    p.add_argument("-n", type=int, default=1_000_000)
+    p.add_argument("--memory", action="store_true", help="also trace peak Python memory (slower)")
+    p.set_defaults(func=bench_export)
+
+    p = subparsers.add_parser("chart", help="analysis time chart render time as the history grows")
+    p.add_argument("--years", type=int, nargs="+", default=[1, 5, 20])
+    p.set_defaults(func=bench_chart)
+
+    p = subparsers.add_parser("journal", help="session journal event cost on the timer thread")
+    p.add_argument("-n", type=int, default=10_000)
+    p.set_defaults(func=bench_journal)
+
+    p = subparsers.add_parser("storage", help="bytes per session of study_log, its index and the rollup")
+    p.add_argument("-n", type=int, default=1_000_000)
+    p.set_defaults(func=bench_storage)
+
+    p = subparsers.add_parser("profiles", help="per-profile lookup cost as the number of profiles grows")
+    p.add_argument("--counts", type=int, nargs="+", default=[1, 10, 100])
+    p.add_argument("--rows", type=int, default=10_000, help="study records per profile")
+    p.add_argument("-n", type=int, default=1_000)
+    p.set_defaults(func=bench_profiles)
+
+    p = subparsers.add_parser("write_behind", help="insert throughput, commit per row vs group commit")
+    p.add_argument("-n", type=int, default=20_000)
+    p.add_argument("--threads", type=int, default=8)
+    p.add_argument("--synchronous", choices=("NORMAL", "FULL"), default="NORMAL")
+    p.set_defaults(func=bench_write_behind)
+
+    p = subparsers.add_parser("query_cache", help="repeated reads, uncached vs from the query cache")
+    p.add_argument("-n", type=int, default=1_000)
+    p.add_argument("--rows", type=int, default=100_000, help="study records")
+    p.add_argument("--tab-rows", type=int, default=200, help="goals, exam goals and mock exams")
+    p.set_defaults(func=bench_query_cache)
+
+    p = subparsers.add_parser("query_plans", help="check that every hot query uses an index")
+    p.set_defaults(func=check_query_plans)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
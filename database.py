@@ -1,216 +1,1696 @@
 import sqlite3
-import pandas as pd
-from datetime import datetime, timedelta
+import threading
+import atexit
+import functools
+import os
+import queue
+import re
+import sys
+import weakref
+from concurrent.futures import Future
+from time import monotonic as _monotonic
+from urllib.request import pathname2url
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime, time, timedelta
 
-DB_FILE = "study_log.db"
+DEFAULT_DB_FILE = "study_log.db"
+DB_FILE = DEFAULT_DB_FILE  # the current profile's database (see set_profile)
 
-def init_db():
-    """Initializes the database and creates tables if they don't exist."""
-    with sqlite3.connect(DB_FILE) as conn:
-        cursor = conn.cursor()
-        # Study log table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS study_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                subject TEXT NOT NULL,
-                minutes INTEGER NOT NULL
-            )
-        """)
-        # Goals table - new schema
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS goals (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                goal_type TEXT NOT NULL, -- 'daily' or 'weekly'
-                subject TEXT NOT NULL,   -- Specific subject or 'All'
-                start_date TEXT NOT NULL, -- Date for daily, or start of week for weekly
-                target_minutes INTEGER NOT NULL,
-                notes TEXT,
-                UNIQUE(goal_type, subject, start_date)
-            )
-        """)
+# Pragmas applied once to every new connection. WAL lets readers run alongside
+# the writer, and synchronous=NORMAL only fsyncs at checkpoints in WAL mode.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",  # ~8 MB page cache
+    "PRAGMA busy_timeout=5000",
+)
+STATEMENT_CACHE_SIZE = 256
+# Read-only connections skip the journal pragmas (they would need write access)
+READ_ONLY_PRAGMAS = (
+    "PRAGMA query_only=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA busy_timeout=5000",
+)
+# When set, get_connection() opens DB_FILE with mode=ro (see use_read_only)
+READ_ONLY = False
+
+_local = threading.local()
+_all_connections = []
+_connections_lock = threading.Lock()
+_generation = 0  # bumped by close_connections() so threads reopen lazily
+
+def get_connection():
+    """Returns this thread's long-lived connection to DB_FILE, opening it on first use.
+
+    The connection can be used as a context manager: it commits on success and
+    rolls back on error, but stays open for the next call.
+    """
+    if getattr(_local, "generation", None) != _generation:
+        _local.connections = {}
+        _local.generation = _generation
+    key = (DB_FILE, READ_ONLY)
+    conn = _local.connections.get(key)
+    if conn is None:
+        # check_same_thread is off only so close_connections() can close every
+        # connection at exit; each connection is still used by its own thread.
+        if READ_ONLY:
+            uri = f"file:{pathname2url(os.path.abspath(DB_FILE))}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, cached_statements=STATEMENT_CACHE_SIZE,
+                                   check_same_thread=False, factory=_Connection)
+            pragmas = READ_ONLY_PRAGMAS
+        else:
+            conn = sqlite3.connect(DB_FILE, cached_statements=STATEMENT_CACHE_SIZE,
+                                   check_same_thread=False, factory=_Connection)
+            pragmas = CONNECTION_PRAGMAS
+        conn.db_file = DB_FILE
+        for pragma in pragmas:
+            conn.execute(pragma)
+        _local.connections[key] = conn
+        with _connections_lock:
+            _all_connections.append(conn)
+    return conn
+
+def close_connections():
+    """Closes every pooled connection (all threads). Called automatically at exit."""
+    global _generation
+    with _connections_lock:
+        _generation += 1
+        for conn in _all_connections:
+            conn.close()
+        _all_connections.clear()
+
+atexit.register(close_connections)
+
+def use_read_only(db_file):
+    """Makes every connection in this process a read-only one on db_file.
+
+    Used as the initializer of report worker processes: each worker reads the
+    database through its own connection and can never write to it.
+    """
+    global DB_FILE, READ_ONLY
+    DB_FILE = db_file
+    READ_ONLY = True
+
+# --- Profiles ---
+# Every profile (one student) has a database file of its own, so students never
+# wait on each other's writes and every query only ever sees one student's
+# rows: the cost of a lookup does not depend on how many profiles exist. The
+# default profile keeps the original study_log.db; the others live in
+# PROFILES_DIR. Connections, table versions and the caches built on them are
+# all keyed by DB_FILE, so switching back and forth needs no invalidation.
+
+DEFAULT_PROFILE = "default"
+PROFILES_DIR = "profiles"
+PROFILE = DEFAULT_PROFILE
+_PROFILE_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]{0,63}")
+
+def profile_path(name):
+    """Returns the database file of a profile. Raises ValueError for an invalid name."""
+    if name == DEFAULT_PROFILE:
+        return DEFAULT_DB_FILE
+    if not _PROFILE_NAME.fullmatch(name or ""):
+        raise ValueError("Profile names may only contain letters, digits, '-' and '_' "
+                         "(at most 64 characters).")
+    return os.path.join(PROFILES_DIR, f"{name}.db")
+
+def list_profiles():
+    """Returns the names of all existing profiles, the default profile first."""
+    try:
+        files = os.listdir(PROFILES_DIR)
+    except FileNotFoundError:
+        files = []
+    names = sorted(name for name, ext in map(os.path.splitext, files)
+                   if ext == ".db" and name != DEFAULT_PROFILE and _PROFILE_NAME.fullmatch(name))
+    return [DEFAULT_PROFILE] + names
+
+def set_profile(name):
+    """Makes name the current profile: later calls in every thread use its database.
+
+    The database is created and migrated on first use. Returns its path.
+    Callers switch only when no other thread is using the database, so no
+    write meant for one profile lands in another.
+    """
+    global DB_FILE, PROFILE
+    path = profile_path(name)
+    if name != DEFAULT_PROFILE:
+        os.makedirs(PROFILES_DIR, exist_ok=True)
+    previous = DB_FILE, PROFILE
+    DB_FILE, PROFILE = path, name
+    try:
+        init_db()
+    except Exception:
+        DB_FILE, PROFILE = previous
+        raise
+    return path
+
+# --- Table versions ---
+# Every write path bumps the version of the table it changed (after the
+# commit). Readers that cache derived data, such as the query cache below and
+# the analysis window's aggregates, compare versions instead of re-querying.
+# Versions are kept per database file.
+#
+# Commits from other processes (the importer or server, a second app
+# instance) are noticed with PRAGMA data_version, which changes when any
+# other connection has committed since it was last read, this process's
+# other threads included. Every pooled connection therefore counts the
+# commits made through it, and a data_version change only counts as external
+# when this process's other connections made no commit since the last check.
+# An external commit then makes every table of the file count as changed.
+# The count is raised just before the commit, so a race between threads can
+# only make a commit look external (invalidating too much). data_version
+# moves once per check however many commits happened, so an external commit
+# that lands in the same interval as one of this process's is taken for ours.
+
+_table_versions = {}
+_external_versions = {}  # DB_FILE -> number of times another process's commit was noticed
+_own_commits = {}        # DB_FILE -> commits made through this process's connections
+_versions_lock = threading.Lock()
+
+class _Connection(sqlite3.Connection):
+    """Pooled connection that counts the commits made through it (see above)."""
+
+    commits = 0
+    seen_data_version = None   # PRAGMA data_version at the last check
+    seen_other_commits = 0     # this process's commits through other connections by then
+
+    def commit(self):
+        self._count_commit(super().commit, self.in_transaction)
+
+    def __exit__(self, exc_type, exc, tb):
+        # The context manager commits on success without calling commit()
+        wrote = exc_type is None and self.in_transaction
+        return self._count_commit(functools.partial(super().__exit__, exc_type, exc, tb), wrote)
+
+    def _count_commit(self, commit, wrote):
+        if wrote:
+            self._add_commits(1)
         try:
-            cursor.execute("ALTER TABLE goals ADD COLUMN start_date TEXT NOT NULL DEFAULT ''")
-        except sqlite3.OperationalError:
-            # Column already exists, which is fine
-            pass
-        # Mock Exams table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS mock_exams (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                subject TEXT NOT NULL,
-                exam_name TEXT NOT NULL,
-                score INTEGER,
-                max_score INTEGER,
-                deviation_value REAL
-            )
-        """)
-        # Exam Goals table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS mock_exam_goals (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                subject TEXT NOT NULL,
-                exam_name TEXT NOT NULL,
-                target_score INTEGER NOT NULL,
-                status TEXT NOT NULL DEFAULT 'Active',
-                notes TEXT
-            )
-        """)
-        # Add exam_date column to existing table if it doesn't exist
+            return commit()
+        except BaseException:
+            if wrote:
+                self._add_commits(-1)
+            raise
+
+    def _add_commits(self, count):
+        with _versions_lock:
+            self.commits += count
+            _own_commits[self.db_file] = _own_commits.get(self.db_file, 0) + count
+
+def _check_data_version():
+    conn = get_connection()
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    with _versions_lock:
+        other_commits = _own_commits.get(DB_FILE, 0) - conn.commits
+        # The remainder of the change that this process's own commits do not
+        # explain; a connection seen for the first time cannot tell what
+        # happened before it opened.
+        if conn.seen_data_version is None:
+            external = True
+        else:
+            external = (data_version - conn.seen_data_version
+                        > other_commits - conn.seen_other_commits)
+        conn.seen_data_version, conn.seen_other_commits = data_version, other_commits
+        if external:
+            _external_versions[DB_FILE] = _external_versions.get(DB_FILE, 0) + 1
+
+def _versions_of(tables):
+    """Returns the current version of each table (one data_version check for all)."""
+    _check_data_version()
+    external = _external_versions.get(DB_FILE, 0)
+    return tuple(_table_versions.get((DB_FILE, table), 0) + external for table in tables)
+
+def table_version(table):
+    """Returns a number that changes whenever table may have been written,
+    by this process or through another connection."""
+    return _versions_of((table,))[0]
+
+def _bump_version(*tables):
+    with _versions_lock:
+        for table in tables:
+            key = (DB_FILE, table)
+            _table_versions[key] = _table_versions.get(key, 0) + 1
+
+# --- Query cache ---
+# Reads that repeat on every click (tab reloads, the progress display) are
+# answered from an in-process LRU cache. An entry is keyed by DB_FILE, the
+# reader and its arguments, and remembers the versions of the tables it was
+# read from: every write bumps its table's version, and a commit by another
+# process invalidates every entry of its file, so the next call misses and
+# runs the query again. Lists and DataFrames are handed out as
+# copies, so callers may modify what they get.
+
+QUERY_CACHE_SIZE = 256  # entries
+
+CacheStats = namedtuple("CacheStats", "hits misses evictions size max_size")
+
+def _copy_result(result):
+    # Lists and DataFrames have copy(); tuples, numbers and None are immutable
+    copy = getattr(result, "copy", None)
+    return result if copy is None else copy()
+
+def _key_part(value):
+    return tuple(value) if isinstance(value, (list, set)) else value
+
+class QueryCache:
+    """Thread-safe LRU cache of read results, invalidated by table versions."""
+
+    def __init__(self, max_size=QUERY_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (table versions, result)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, tables, load):
+        """Returns the result cached under key if none of tables changed since, else load()."""
+        versions = _versions_of(tables)  # read before querying
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == versions:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy_result(entry[1])
+            self.misses += 1
+        result = load()
+        with self._lock:
+            self._entries[key] = (versions, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return _copy_result(result)
+
+    def clear(self):
+        """Drops every entry and resets the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            return CacheStats(self.hits, self.misses, self.evictions, len(self._entries), self.max_size)
+
+_query_cache = QueryCache()
+
+def query_cache_stats():
+    """Returns the CacheStats (hits, misses, evictions, size, max_size) of the query cache."""
+    return _query_cache.stats()
+
+def clear_query_cache():
+    """Empties the query cache and resets its statistics."""
+    _query_cache.clear()
+
+def _cached(*tables):
+    """Decorator: serve the reader from the query cache until a write bumps one of tables.
+
+    The undecorated reader stays available as func.__wrapped__.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def cached(*args, **kwargs):
+            key = (DB_FILE, func.__name__, tuple(map(_key_part, args)),
+                   tuple(sorted((name, _key_part(value)) for name, value in kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:  # an argument that cannot be a key; just run the query
+                return func(*args, **kwargs)
+            return _query_cache.get(key, tables, lambda: func(*args, **kwargs))
+        return cached
+    return decorate
+
+# --- Row types ---
+# Lightweight rows for callers that just walk the results once (the UI).
+# namedtuples are tuples with __slots__ = (), so they cost no more memory than
+# the raw cursor rows and still unpack and index like them. pandas is only
+# imported by the get_* DataFrame functions used for analytics.
+
+StudyRecord = namedtuple("StudyRecord", "id date start_time subject seconds")
+Goal = namedtuple("Goal", "id goal_type subject start_date target_minutes notes")
+MockExam = namedtuple("MockExam", "id date subject exam_name score max_score deviation_value")
+ExamGoal = namedtuple("ExamGoal", "id subject exam_name exam_date target_score status notes")
+Subject = namedtuple("Subject", "id name")
+
+def _fetch_rows(row_type, sql, params=()):
+    """Runs a query and returns its rows as row_type instances."""
+    with get_connection() as conn:
+        return list(map(row_type._make, conn.execute(sql, params)))
+
+def _read_frame(sql, params=()):
+    """Runs a query and returns a pandas DataFrame (pandas is imported on first use)."""
+    import pandas as pd
+    with get_connection() as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+# --- Date helpers ---
+# Dates are stored as integer day numbers (days since 1970-01-01). They are
+# smaller than ISO strings, compare numerically and make range scans cheap.
+# Readers convert back with date(day * 86400, 'unixepoch') so callers still
+# see 'YYYY-MM-DD' strings.
+
+EPOCH = date(1970, 1, 1)
+
+def to_day(value):
+    """Converts a date, datetime or 'YYYY-MM-DD' string to a day number."""
+    if isinstance(value, datetime):
+        value = value.date()
+    elif isinstance(value, str):
+        value = value.strip()
+        if len(value) == 10 and value[4] == value[7] == '-':
+            value = date.fromisoformat(value)  # fast path for zero-padded dates
+        else:
+            value = datetime.strptime(value, '%Y-%m-%d').date()
+    return (value - EPOCH).days
+
+def from_day(day):
+    """Converts a day number back to a date."""
+    return EPOCH + timedelta(days=day)
+
+def _day_range(column, start, end):
+    """Returns (WHERE conditions, params) for start <= column <= end; None leaves a side open."""
+    conditions, params = [], []
+    if start is not None:
+        conditions.append(f"{column} >= ?")
+        params.append(to_day(start))
+    if end is not None:
+        conditions.append(f"{column} <= ?")
+        params.append(to_day(end))
+    return conditions, params
+
+# Formats older releases let through free-text date fields, tried by migrations
+LEGACY_DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%Y.%m.%d', '%Y%m%d', '%Y年%m月%d日')
+
+def _to_day_or_none(value):
+    """SQL helper used by migrations: like to_day(), but also accepts
+    LEGACY_DATE_FORMATS (with an optional time after a space), and NULL for
+    blank or unparseable values."""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.split()[0]
+    for date_format in LEGACY_DATE_FORMATS:
         try:
-            cursor.execute("ALTER TABLE mock_exam_goals ADD COLUMN exam_date TEXT")
-        except sqlite3.OperationalError:
-            # Column already exists, which is fine
+            return (datetime.strptime(value, date_format).date() - EPOCH).days
+        except ValueError:
             pass
-        conn.commit()
+    return None
+
+# --- Validation ---
+# Shared by the input forms and the bulk importer so both accept exactly the
+# same rows. Each validator returns the row ready for INSERT and raises
+# ValueError with a message that can be shown to the user.
+
+def _text(value):
+    return "" if value is None else str(value).strip()
+
+def _day(value):
+    try:
+        return to_day(value)
+    except (TypeError, ValueError):
+        raise ValueError("Date must be in YYYY-MM-DD format.") from None
+
+def _subject(value):
+    """A record's subject; 'All' only names goals, never a record."""
+    if value == ALL_SUBJECTS:
+        raise ValueError(f'"{ALL_SUBJECTS}" is reserved for goals that cover every subject.')
+    return value
+
+def _start(value):
+    """Seconds after midnight for an optional 'HH:MM' or 'HH:MM:SS' start time."""
+    value = _text(value)
+    if not value:
+        return None
+    try:
+        start = time.fromisoformat(value)
+    except ValueError:
+        raise ValueError("Start Time must be in HH:MM:SS format.") from None
+    return start.hour * 3600 + start.minute * 60 + start.second
+
+def _format_start(start):
+    """The inverse of _start(): 'HH:MM:SS', or None for an unknown start."""
+    if start is None:
+        return None
+    return time(start // 3600, start // 60 % 60, start % 60).isoformat()
+
+def validate_study_record(date, subject, minutes=None, seconds=None, start_time=None):
+    """Returns (day, start, subject, seconds) for a study record.
+
+    The duration is given either in whole seconds or in (whole) minutes;
+    seconds wins when both are present. start_time is optional.
+    """
+    subject, minutes, seconds = _text(subject), _text(minutes), _text(seconds)
+    if not _text(date) or not subject or not (minutes or seconds):
+        raise ValueError("Date, Subject, and Seconds or Minutes are required.")
+    day = _day(date)
+    _subject(subject)
+    if seconds:
+        if not seconds.isdigit() or int(seconds) == 0:
+            raise ValueError("Seconds must be a positive whole number.")
+        seconds = int(seconds)
+    else:
+        if not minutes.isdigit() or int(minutes) == 0:
+            raise ValueError("Minutes must be a positive whole number.")
+        seconds = int(minutes) * 60
+    return day, _start(start_time), subject, seconds
+
+def validate_session(started_at, subject, seconds):
+    """Returns (day, start, subject, seconds) for a timed session that began at
+    started_at (a local datetime); seconds is rounded to whole seconds."""
+    start = started_at.hour * 3600 + started_at.minute * 60 + started_at.second
+    return _study_row(to_day(started_at), start, subject, round(seconds))
+
+def _study_row(day, start, subject, seconds):
+    """Checks a (day, start, subject, seconds) row whose day and start are
+    already numbers, with the same messages as validate_study_record()."""
+    subject = _text(subject)
+    if not subject:
+        raise ValueError("Date, Subject, and Seconds or Minutes are required.")
+    _subject(subject)
+    if not isinstance(seconds, int) or seconds <= 0:
+        raise ValueError("Seconds must be a positive whole number.")
+    return day, start, subject, seconds
+
+def validate_mock_exam(date, subject, exam_name, score, max_score, deviation_value):
+    """Returns (day, subject, exam_name, score, max_score, deviation_value) for a mock exam.
+
+    score, max_score and deviation_value are optional; blanks become None.
+    """
+    subject, exam_name = _text(subject), _text(exam_name)
+    score, max_score, deviation_value = _text(score), _text(max_score), _text(deviation_value)
+    if not _text(date) or not subject or not exam_name:
+        raise ValueError("Date, Subject, and Exam Name are required.")
+    day = _day(date)
+    _subject(subject)
+    if score and not score.isdigit():
+        raise ValueError("Score must be a number.")
+    if max_score and not max_score.isdigit():
+        raise ValueError("Max Score must be a number.")
+    try:
+        deviation_value = float(deviation_value) if deviation_value else None
+    except ValueError:
+        raise ValueError("Deviation must be a number.") from None
+    return (day, subject, exam_name, int(score) if score else None,
+            int(max_score) if max_score else None, deviation_value)
+
+def validate_goal(goal_type, subject, start_date, target_minutes, notes=None):
+    """Returns (goal_type, subject, start_date, target_minutes, notes) for set_goal()."""
+    goal_type, subject, target_minutes = _text(goal_type), _text(subject), _text(target_minutes)
+    if goal_type not in ("daily", "weekly"):
+        raise ValueError("Goal type must be daily or weekly.")
+    if not subject or not _text(start_date) or not target_minutes:
+        raise ValueError("Subject, Start Date, and Target Minutes are required.")
+    _day(start_date)
+    if not target_minutes.isdigit() or int(target_minutes) == 0:
+        raise ValueError("Target Minutes must be a positive whole number.")
+    return goal_type, subject, _text(start_date), int(target_minutes), _text(notes)
+
+def validate_subject_name(name):
+    """Returns the stripped subject name, or raises ValueError."""
+    name = _text(name)
+    if not name:
+        raise ValueError("Subject name is required.")
+    return _subject(name)
+
+# --- Schema migrations ---
+# Each migration upgrades the schema by one version; PRAGMA user_version records
+# the version a database file is at. Append new migrations, never edit old ones.
+
+def _columns(cursor, table):
+    return {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+
+def _migrate_base_schema(cursor):
+    """v1: the original tables, including columns added by older releases."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS study_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            minutes INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS goals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            goal_type TEXT NOT NULL, -- 'daily' or 'weekly'
+            subject TEXT NOT NULL,   -- Specific subject or 'All'
+            start_date TEXT NOT NULL, -- Date for daily, or start of week for weekly
+            target_minutes INTEGER NOT NULL,
+            notes TEXT,
+            UNIQUE(goal_type, subject, start_date)
+        )
+    """)
+    if "start_date" not in _columns(cursor, "goals"):
+        cursor.execute("ALTER TABLE goals ADD COLUMN start_date TEXT NOT NULL DEFAULT ''")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS mock_exams (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            exam_name TEXT NOT NULL,
+            score INTEGER,
+            max_score INTEGER,
+            deviation_value REAL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS mock_exam_goals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            subject TEXT NOT NULL,
+            exam_name TEXT NOT NULL,
+            target_score INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'Active',
+            notes TEXT
+        )
+    """)
+    if "exam_date" not in _columns(cursor, "mock_exam_goals"):
+        cursor.execute("ALTER TABLE mock_exam_goals ADD COLUMN exam_date TEXT")
+
+def _set_aside_undated(cursor, table, column):
+    """Copies the rows of table whose column holds a date that cannot be parsed
+    into {table}_undated, so a migration can drop or blank it without losing
+    what the user typed. Returns the number of rows copied."""
+    condition = f"{column} != '' AND to_day({column}) IS NULL"
+    count = cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE {condition}").fetchone()[0]
+    if count:
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {table}_undated AS SELECT * FROM {table} WHERE 0")
+        cursor.execute(f"INSERT INTO {table}_undated SELECT * FROM {table} WHERE {condition}")
+        print(f"{count} {table} row(s) with an unreadable {column} were kept in {table}_undated.",
+              file=sys.stderr)
+    return count
+
+def _migrate_day_numbers(cursor):
+    """v2: store every date as an integer day number.
+
+    The tables are rebuilt, which also gives old databases the current
+    UNIQUE(goal_type, subject, start_day) constraint on goals. Rows whose
+    date cannot be read are kept in *_undated side tables (see
+    _set_aside_undated); exam goals keep their row with no exam day.
+    """
+    _set_aside_undated(cursor, "study_log", "date")
+    _set_aside_undated(cursor, "goals", "start_date")
+    _set_aside_undated(cursor, "mock_exams", "date")
+    _set_aside_undated(cursor, "mock_exam_goals", "exam_date")
+    cursor.execute("""
+        CREATE TABLE study_log_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            day INTEGER NOT NULL,
+            subject TEXT NOT NULL,
+            minutes INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO study_log_new (id, day, subject, minutes)
+        SELECT id, to_day(date), subject, minutes FROM study_log
+        WHERE to_day(date) IS NOT NULL
+    """)
+    cursor.execute("""
+        CREATE TABLE goals_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            goal_type TEXT NOT NULL, -- 'daily' or 'weekly'
+            subject TEXT NOT NULL,   -- Specific subject or 'All'
+            start_day INTEGER NOT NULL, -- Day for daily, or first day of the week for weekly
+            target_minutes INTEGER NOT NULL,
+            notes TEXT,
+            UNIQUE(goal_type, subject, start_day)
+        )
+    """)
+    # Goals saved before start_date existed have no usable period; they never matched
+    # get_progress() anyway, so they are dropped rather than guessed at.
+    cursor.execute("""
+        INSERT OR IGNORE INTO goals_new (id, goal_type, subject, start_day, target_minutes, notes)
+        SELECT id, goal_type, subject, to_day(start_date), target_minutes, notes FROM goals
+        WHERE to_day(start_date) IS NOT NULL
+    """)
+    cursor.execute("""
+        CREATE TABLE mock_exams_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            day INTEGER NOT NULL,
+            subject TEXT NOT NULL,
+            exam_name TEXT NOT NULL,
+            score INTEGER,
+            max_score INTEGER,
+            deviation_value REAL
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO mock_exams_new (id, day, subject, exam_name, score, max_score, deviation_value)
+        SELECT id, to_day(date), subject, exam_name, score, max_score, deviation_value FROM mock_exams
+        WHERE to_day(date) IS NOT NULL
+    """)
+    cursor.execute("""
+        CREATE TABLE mock_exam_goals_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            subject TEXT NOT NULL,
+            exam_name TEXT NOT NULL,
+            exam_day INTEGER,
+            target_score INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'Active',
+            notes TEXT
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO mock_exam_goals_new (id, subject, exam_name, exam_day, target_score, status, notes)
+        SELECT id, subject, exam_name, to_day(exam_date), target_score, status, notes FROM mock_exam_goals
+    """)
+    for table in ("study_log", "goals", "mock_exams", "mock_exam_goals"):
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+def _migrate_indexes(cursor):
+    """v3: secondary indexes for the hot queries."""
+    # Covers get_progress() for one subject and for 'All' without touching the table
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_study_log_day_subject ON study_log (day, subject, minutes)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_goals_start_day ON goals (start_day)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_mock_exams_day ON mock_exams (day)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_mock_exam_goals_exam_day ON mock_exam_goals (exam_day)")
+
+def _migrate_daily_totals(cursor):
+    """v4: daily_totals rollup of study_log, kept current by triggers."""
+    cursor.execute("""
+        CREATE TABLE daily_totals (
+            day INTEGER NOT NULL,
+            subject TEXT NOT NULL,
+            minutes INTEGER NOT NULL,
+            PRIMARY KEY (day, subject)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TRIGGER study_log_after_insert AFTER INSERT ON study_log BEGIN
+            INSERT INTO daily_totals (day, subject, minutes) VALUES (NEW.day, NEW.subject, NEW.minutes)
+            ON CONFLICT(day, subject) DO UPDATE SET minutes = minutes + excluded.minutes;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER study_log_after_delete AFTER DELETE ON study_log BEGIN
+            UPDATE daily_totals SET minutes = minutes - OLD.minutes
+            WHERE day = OLD.day AND subject = OLD.subject;
+            DELETE FROM daily_totals WHERE day = OLD.day AND subject = OLD.subject AND minutes = 0;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER study_log_after_update AFTER UPDATE OF day, subject, minutes ON study_log BEGIN
+            UPDATE daily_totals SET minutes = minutes - OLD.minutes
+            WHERE day = OLD.day AND subject = OLD.subject;
+            DELETE FROM daily_totals WHERE day = OLD.day AND subject = OLD.subject AND minutes = 0;
+            INSERT INTO daily_totals (day, subject, minutes) VALUES (NEW.day, NEW.subject, NEW.minutes)
+            ON CONFLICT(day, subject) DO UPDATE SET minutes = minutes + excluded.minutes;
+        END
+    """)
+    cursor.execute("""
+        INSERT INTO daily_totals (day, subject, minutes)
+        SELECT day, subject, SUM(minutes) FROM study_log
+        GROUP BY day, subject HAVING SUM(minutes) != 0
+    """)
+
+def _migrate_session_events(cursor):
+    """v5: append-only journal of timer events, for recovering sessions after a crash."""
+    cursor.execute("""
+        CREATE TABLE session_events (
+            id INTEGER PRIMARY KEY,
+            session_id INTEGER NOT NULL,
+            event TEXT NOT NULL,
+            at REAL NOT NULL,
+            elapsed REAL NOT NULL,
+            subject TEXT NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX idx_session_events_session ON session_events(session_id, id)")
+
+def _migrate_seconds(cursor):
+    """v6: study_log and daily_totals count seconds; study_log records when a session started.
+
+    A session is (day, start, seconds): start is the seconds after local
+    midnight of day (NULL when unknown, as for every row logged before v6),
+    so all three are small integers that SQLite stores in 1-3 bytes each.
+    Existing rows only had whole minutes and are converted exactly.
+    """
+    cursor.execute("""
+        CREATE TABLE study_log_new (
+            id INTEGER PRIMARY KEY,
+            day INTEGER NOT NULL,
+            start INTEGER,
+            subject TEXT NOT NULL,
+            seconds INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO study_log_new (id, day, start, subject, seconds)
+        SELECT id, day, NULL, subject, minutes * 60 FROM study_log
+    """)
+    # Dropping the old tables drops their index and triggers as well
+    cursor.execute("DROP TABLE study_log")
+    cursor.execute("ALTER TABLE study_log_new RENAME TO study_log")
+    cursor.execute("CREATE INDEX idx_study_log_day_subject ON study_log (day, subject, seconds)")
+    cursor.execute("DROP TABLE daily_totals")
+    cursor.execute("""
+        CREATE TABLE daily_totals (
+            day INTEGER NOT NULL,
+            subject TEXT NOT NULL,
+            seconds INTEGER NOT NULL,
+            PRIMARY KEY (day, subject)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TRIGGER study_log_after_insert AFTER INSERT ON study_log BEGIN
+            INSERT INTO daily_totals (day, subject, seconds) VALUES (NEW.day, NEW.subject, NEW.seconds)
+            ON CONFLICT(day, subject) DO UPDATE SET seconds = seconds + excluded.seconds;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER study_log_after_delete AFTER DELETE ON study_log BEGIN
+            UPDATE daily_totals SET seconds = seconds - OLD.seconds
+            WHERE day = OLD.day AND subject = OLD.subject;
+            DELETE FROM daily_totals WHERE day = OLD.day AND subject = OLD.subject AND seconds = 0;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER study_log_after_update AFTER UPDATE OF day, subject, seconds ON study_log BEGIN
+            UPDATE daily_totals SET seconds = seconds - OLD.seconds
+            WHERE day = OLD.day AND subject = OLD.subject;
+            DELETE FROM daily_totals WHERE day = OLD.day AND subject = OLD.subject AND seconds = 0;
+            INSERT INTO daily_totals (day, subject, seconds) VALUES (NEW.day, NEW.subject, NEW.seconds)
+            ON CONFLICT(day, subject) DO UPDATE SET seconds = seconds + excluded.seconds;
+        END
+    """)
+    cursor.execute("""
+        INSERT INTO daily_totals (day, subject, seconds)
+        SELECT day, subject, SUM(seconds) FROM study_log
+        GROUP BY day, subject HAVING SUM(seconds) != 0
+    """)
+
+def _migrate_subjects(cursor):
+    """v7: subject names move to a subjects table; every other table refers to them by id.
+
+    Rows keep a 1-byte integer instead of repeating the name, so the tables,
+    the (day, subject_id, seconds) index and the daily_totals keys shrink, and
+    grouping compares integers. The subjects are seeded with the ones the app
+    used to hard-code plus every name found in the existing rows. 'All'
+    (the goal for every subject) is the reserved id ALL_SUBJECTS_ID.
+    """
+    cursor.execute("CREATE TABLE subjects (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    cursor.execute("INSERT INTO subjects (id, name) VALUES (?, ?)", (ALL_SUBJECTS_ID, ALL_SUBJECTS))
+    cursor.executemany("INSERT INTO subjects (name) VALUES (?)", ((name,) for name in DEFAULT_SUBJECTS))
+    cursor.execute("""
+        INSERT OR IGNORE INTO subjects (name)
+        SELECT subject FROM study_log UNION SELECT subject FROM goals
+        UNION SELECT subject FROM mock_exams UNION SELECT subject FROM mock_exam_goals
+        ORDER BY 1
+    """)
+    cursor.execute("""
+        CREATE TABLE study_log_new (
+            id INTEGER PRIMARY KEY,
+            day INTEGER NOT NULL,
+            start INTEGER,
+            subject_id INTEGER NOT NULL REFERENCES subjects (id),
+            seconds INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO study_log_new (id, day, start, subject_id, seconds)
+        SELECT l.id, l.day, l.start, s.id, l.seconds FROM study_log AS l JOIN subjects AS s ON s.name = l.subject
+    """)
+    cursor.execute("""
+        CREATE TABLE goals_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            goal_type TEXT NOT NULL, -- 'daily' or 'weekly'
+            subject_id INTEGER NOT NULL REFERENCES subjects (id), -- ALL_SUBJECTS_ID for 'All'
+            start_day INTEGER NOT NULL, -- Day for daily, or first day of the week for weekly
+            target_minutes INTEGER NOT NULL,
+            notes TEXT,
+            UNIQUE(goal_type, subject_id, start_day)
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO goals_new (id, goal_type, subject_id, start_day, target_minutes, notes)
+        SELECT g.id, g.goal_type, s.id, g.start_day, g.target_minutes, g.notes
+        FROM goals AS g JOIN subjects AS s ON s.name = g.subject
+    """)
+    cursor.execute("""
+        CREATE TABLE mock_exams_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            day INTEGER NOT NULL,
+            subject_id INTEGER NOT NULL REFERENCES subjects (id),
+            exam_name TEXT NOT NULL,
+            score INTEGER,
+            max_score INTEGER,
+            deviation_value REAL
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO mock_exams_new (id, day, subject_id, exam_name, score, max_score, deviation_value)
+        SELECT m.id, m.day, s.id, m.exam_name, m.score, m.max_score, m.deviation_value
+        FROM mock_exams AS m JOIN subjects AS s ON s.name = m.subject
+    """)
+    cursor.execute("""
+        CREATE TABLE mock_exam_goals_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            subject_id INTEGER NOT NULL REFERENCES subjects (id),
+            exam_name TEXT NOT NULL,
+            exam_day INTEGER,
+            target_score INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'Active',
+            notes TEXT
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO mock_exam_goals_new (id, subject_id, exam_name, exam_day, target_score, status, notes)
+        SELECT g.id, s.id, g.exam_name, g.exam_day, g.target_score, g.status, g.notes
+        FROM mock_exam_goals AS g JOIN subjects AS s ON s.name = g.subject
+    """)
+    # Dropping the old tables drops their indexes and the study_log triggers as well
+    for table in ("study_log", "goals", "mock_exams", "mock_exam_goals", "daily_totals"):
+        cursor.execute(f"DROP TABLE {table}")
+    for table in ("study_log", "goals", "mock_exams", "mock_exam_goals"):
+        cursor.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    cursor.execute("CREATE INDEX idx_study_log_day_subject ON study_log (day, subject_id, seconds)")
+    cursor.execute("CREATE INDEX idx_goals_start_day ON goals (start_day)")
+    cursor.execute("CREATE INDEX idx_mock_exams_day ON mock_exams (day)")
+    cursor.execute("CREATE INDEX idx_mock_exam_goals_exam_day ON mock_exam_goals (exam_day)")
+    cursor.execute("""
+        CREATE TABLE daily_totals (
+            day INTEGER NOT NULL,
+            subject_id INTEGER NOT NULL,
+            seconds INTEGER NOT NULL,
+            PRIMARY KEY (day, subject_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TRIGGER study_log_after_insert AFTER INSERT ON study_log BEGIN
+            INSERT INTO daily_totals (day, subject_id, seconds) VALUES (NEW.day, NEW.subject_id, NEW.seconds)
+            ON CONFLICT(day, subject_id) DO UPDATE SET seconds = seconds + excluded.seconds;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER study_log_after_delete AFTER DELETE ON study_log BEGIN
+            UPDATE daily_totals SET seconds = seconds - OLD.seconds
+            WHERE day = OLD.day AND subject_id = OLD.subject_id;
+            DELETE FROM daily_totals WHERE day = OLD.day AND subject_id = OLD.subject_id AND seconds = 0;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER study_log_after_update AFTER UPDATE OF day, subject_id, seconds ON study_log BEGIN
+            UPDATE daily_totals SET seconds = seconds - OLD.seconds
+            WHERE day = OLD.day AND subject_id = OLD.subject_id;
+            DELETE FROM daily_totals WHERE day = OLD.day AND subject_id = OLD.subject_id AND seconds = 0;
+            INSERT INTO daily_totals (day, subject_id, seconds) VALUES (NEW.day, NEW.subject_id, NEW.seconds)
+            ON CONFLICT(day, subject_id) DO UPDATE SET seconds = seconds + excluded.seconds;
+        END
+    """)
+    _rebuild_daily_totals(cursor)
+
+MIGRATIONS = [
+    _migrate_base_schema,
+    _migrate_day_numbers,
+    _migrate_indexes,
+    _migrate_daily_totals,
+    _migrate_session_events,
+    _migrate_seconds,
+    _migrate_subjects,
+]
+
+def init_db():
+    """Initializes the database and brings its schema up to the latest version."""
+    conn = get_connection()
+    conn.create_function("to_day", 1, _to_day_or_none, deterministic=True)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        try:
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+# --- Subjects ---
+# Subject names are stored once, in the subjects table; study_log, goals,
+# mock_exams, mock_exam_goals and daily_totals refer to them by integer id.
+# The public functions still take and return names: writers look the id up
+# (adding subjects they have not seen, e.g. from an import) and readers
+# fetch the name with a primary-key lookup per row. Goals for every subject
+# use the reserved 'All' row. Since any write can add a subject, writers bump
+# the "subjects" version along with their own table.
+
+ALL_SUBJECTS = "All"
+ALL_SUBJECTS_ID = 0
+# Seeded into new databases; users can rename, delete and add to them
+DEFAULT_SUBJECTS = ("Chemistry", "English", "Information", "Japanese", "Math", "Physics", "Social Studies")
+# Tables whose rows show subject names (renaming a subject changes what they read as)
+SUBJECT_TABLES = ("study_log", "goals", "mock_exams", "mock_exam_goals")
+
+# The subject name of the current row of a table with a subject_id column
+_SUBJECT_NAME = "(SELECT name FROM subjects WHERE subjects.id = subject_id)"
+
+def _subject_ids(cursor, names):
+    """Returns {name: id} for names without committing, adding the subjects that are new."""
+    ids = {}
+    for name in set(names):
+        row = cursor.execute("SELECT id FROM subjects WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            cursor.execute("INSERT INTO subjects (name) VALUES (?)", (name,))
+            ids[name] = cursor.lastrowid
+        else:
+            ids[name] = row[0]
+    return ids
+
+def _subject_id(cursor, name):
+    return _subject_ids(cursor, (name,))[name]
+
+def get_subject_ids(names):
+    """Returns {name: id} for the given subject names, adding the ones that do not exist yet."""
+    with get_connection() as conn:
+        ids = _subject_ids(conn.cursor(), names)
+    _bump_version("subjects")
+    return ids
+
+@_cached("subjects")
+def fetch_subjects():
+    """Returns every subject a record can be logged under (not 'All') as Subject rows, by name."""
+    return _fetch_rows(Subject, "SELECT id, name FROM subjects WHERE id != ? ORDER BY name",
+                       (ALL_SUBJECTS_ID,))
+
+def add_subject(name):
+    """Adds a subject and returns it as a Subject. Raises ValueError if the name is taken."""
+    name = validate_subject_name(name)
+    try:
+        with get_connection() as conn:
+            subject_id = conn.execute("INSERT INTO subjects (name) VALUES (?)", (name,)).lastrowid
+    except sqlite3.IntegrityError:
+        raise ValueError(f'A subject named "{name}" already exists.') from None
+    _bump_version("subjects")
+    return Subject(subject_id, name)
+
+def rename_subject(subject_id, name):
+    """Renames a subject everywhere it is used and returns it as a Subject.
+
+    Raises ValueError if the name is taken or the subject does not exist.
+    """
+    name = validate_subject_name(name)
+    if subject_id == ALL_SUBJECTS_ID:
+        raise ValueError(f'"{ALL_SUBJECTS}" cannot be renamed.')
+    try:
+        with get_connection() as conn:
+            updated = conn.execute("UPDATE subjects SET name = ? WHERE id = ?", (name, subject_id)).rowcount
+    except sqlite3.IntegrityError:
+        raise ValueError(f'A subject named "{name}" already exists.') from None
+    if not updated:
+        raise ValueError("The subject no longer exists.")
+    # Every row that refers to the subject now reads with the new name
+    _bump_version("subjects", *SUBJECT_TABLES)
+    return Subject(subject_id, name)
+
+def delete_subject(subject_id):
+    """Deletes a subject nothing refers to. Returns True if a row was deleted.
+
+    Raises ValueError if records, goals or mock exams still use the subject.
+    """
+    if subject_id == ALL_SUBJECTS_ID:
+        raise ValueError(f'"{ALL_SUBJECTS}" cannot be deleted.')
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        uses = sum(cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE subject_id = ?",
+                                  (subject_id,)).fetchone()[0]
+                   for table in SUBJECT_TABLES)
+        if uses:
+            raise ValueError(f"The subject is still used by {uses} records, goals or mock exams.")
+        cursor.execute("DELETE FROM subjects WHERE id = ?", (subject_id,))
+    _bump_version("subjects")
+    return cursor.rowcount > 0
 
 def add_record(date, subject, minutes):
-    """Adds a new study record to the database."""
-    with sqlite3.connect(DB_FILE) as conn:
+    """Adds a study record of whole minutes with no start time and returns it as a StudyRecord.
+
+    Raises ValueError if the values do not pass validate_study_record().
+    """
+    return add_study_records([validate_study_record(date, subject, minutes=minutes)])[0]
+
+def add_session(started_at, subject, seconds):
+    """Adds a study session that began at started_at (a local datetime) and lasted
+    `seconds` (rounded to whole seconds). Returns it as a StudyRecord.
+
+    Raises ValueError if the values do not pass validate_session().
+    """
+    return add_study_records([validate_session(started_at, subject, seconds)])[0]
+
+def insert_study_records(rows):
+    """Inserts many (day, start, subject, seconds) rows in one transaction. Returns the row count.
+
+    Rows must already be validated (see validate_study_record); this is the
+    batch path used by the importer.
+    """
+    rows = list(rows)
+    with get_connection() as conn:
+        ids = _subject_ids(conn.cursor(), [row[2] for row in rows])
+        count = conn.executemany(
+            "INSERT INTO study_log (day, start, subject_id, seconds) VALUES (?, ?, ?, ?)",
+            [(day, start, ids[subject], seconds) for day, start, subject, seconds in rows]).rowcount
+    _bump_version("study_log", "subjects")
+    return count
+
+def add_study_records(rows):
+    """Inserts validated (day, start, subject, seconds) rows in one transaction.
+
+    Like insert_study_records(), but returns the new rows as StudyRecords
+    (with their ids), for callers that answer each insert individually.
+    """
+    with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO study_log (date, subject, minutes) VALUES (?, ?, ?)", 
-                       (date, subject, minutes))
-        conn.commit()
+        records = [_insert_study_record(cursor, row) for row in rows]
+    _bump_version("study_log", "subjects")
+    return records
+
+def _insert_study_record(cursor, row):
+    """Inserts one (day, start, subject, seconds) row without committing; returns its StudyRecord."""
+    day, start, subject, seconds = row
+    cursor.execute("INSERT INTO study_log (day, start, subject_id, seconds) VALUES (?, ?, ?, ?)",
+                   (day, start, _subject_id(cursor, subject), seconds))
+    return StudyRecord(cursor.lastrowid, from_day(day).isoformat(), _format_start(start), subject, seconds)
 
 def delete_study_record(record_id):
-    """Deletes a study record."""
-    with sqlite3.connect(DB_FILE) as conn:
+    """Deletes a study record. Returns True if a row was deleted."""
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM study_log WHERE id = ?", (record_id,))
         conn.commit()
+        _bump_version("study_log")
+        return cursor.rowcount > 0
+
+_RECORDS_QUERY = f"""
+    SELECT id, date(day * 86400, 'unixepoch') AS date, time(start, 'unixepoch') AS start_time,
+    {_SUBJECT_NAME} AS subject, seconds FROM study_log"""
 
 def get_all_records():
     """Retrieves all study records and returns them as a pandas DataFrame."""
-    with sqlite3.connect(DB_FILE) as conn:
-        df = pd.read_sql_query("SELECT id, date, subject, minutes FROM study_log", conn)
-    return df
+    return _read_frame(_RECORDS_QUERY)
+
+def fetch_records():
+    """Retrieves all study records as a list of StudyRecord rows."""
+    return _fetch_rows(StudyRecord, _RECORDS_QUERY)
+
+def _records_range(start, end, subjects=None):
+    """Builds the study_log query for start <= date <= end (oldest first) and its params."""
+    conditions, params = _day_range("day", start, end)
+    if subjects:
+        conditions.append(_subjects_condition(subjects))
+        params.extend(subjects)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return _RECORDS_QUERY + where + " ORDER BY day", params
+
+def get_records_between(start, end, subjects=None):
+    """Retrieves study records with start <= date <= end as a pandas DataFrame, oldest first.
+
+    start and end accept anything to_day() does; None leaves that side open.
+    subjects optionally restricts the result to a list of subject names.
+    The range is answered from the (day, subject_id, seconds) index.
+    """
+    return _read_frame(*_records_range(start, end, subjects))
+
+def iter_records_between(start, end, subjects=None, chunk_size=5000):
+    """Yields StudyRecord rows with start <= date <= end, oldest first.
+
+    Rows are fetched from the cursor chunk_size at a time, so memory stays
+    bounded no matter how long the range is. Arguments are as for
+    get_records_between().
+    """
+    sql, params = _records_range(start, end, subjects)
+    cursor = get_connection().execute(sql, params)
+    try:
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            yield from map(StudyRecord._make, chunk)
+    finally:
+        cursor.close()
+
+@_cached("study_log")
+def get_records_page(before_id=None, limit=200, after_id=None):
+    """Returns up to `limit` StudyRecord rows with id < before_id, newest first.
+
+    Keyset pagination: pass the id of the last row of the previous page to get
+    the next one. Each page is a single primary-key range scan, so its cost does
+    not depend on how many records exist.
+
+    With after_id, returns instead the `limit` rows just above it (id > after_id),
+    still newest first, to page back towards the newest record.
+    """
+    if after_id is not None:
+        rows = _fetch_rows(StudyRecord, _RECORDS_QUERY + " WHERE id > ? ORDER BY id LIMIT ?",
+                           (after_id, limit))
+        return rows[::-1]
+    if before_id is None:
+        return _fetch_rows(StudyRecord, _RECORDS_QUERY + " ORDER BY id DESC LIMIT ?", (limit,))
+    return _fetch_rows(StudyRecord, _RECORDS_QUERY + " WHERE id < ? ORDER BY id DESC LIMIT ?",
+                       (before_id, limit))
 
 def set_goal(goal_type, subject, start_date, target_minutes, notes):
-    """Creates or updates a goal."""
-    with sqlite3.connect(DB_FILE) as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO goals (goal_type, subject, start_date, target_minutes, notes)
-            VALUES (?, ?, ?, ?, ?)
-            ON CONFLICT(goal_type, subject, start_date) DO UPDATE SET
-            target_minutes = excluded.target_minutes,
-            notes = excluded.notes;
-        """, (goal_type, subject, start_date, target_minutes, notes))
+    """Creates or updates a goal and returns it as a Goal."""
+    with get_connection() as conn:
+        goal = _upsert_goal(conn.cursor(), (goal_type, subject, start_date, target_minutes, notes))
         conn.commit()
+        _bump_version("goals", "subjects")
+        return goal
+
+def _upsert_goal(cursor, row):
+    """Creates or updates one goal without committing; returns it as a Goal."""
+    goal_type, subject, start_date, target_minutes, notes = row
+    start_day = to_day(start_date)
+    subject_id = _subject_id(cursor, subject)
+    cursor.execute("""
+        INSERT INTO goals (goal_type, subject_id, start_day, target_minutes, notes)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(goal_type, subject_id, start_day) DO UPDATE SET
+        target_minutes = excluded.target_minutes,
+        notes = excluded.notes;
+    """, (goal_type, subject_id, start_day, target_minutes, notes))
+    # lastrowid is not reliable when the upsert took the UPDATE branch
+    cursor.execute("SELECT id FROM goals WHERE goal_type=? AND subject_id=? AND start_day=?",
+                   (goal_type, subject_id, start_day))
+    goal_id = cursor.fetchone()[0]
+    return Goal(goal_id, goal_type, subject, from_day(start_day).isoformat(), target_minutes, notes)
 
+_GOALS_QUERY = f"""
+    SELECT id, goal_type, {_SUBJECT_NAME} AS subject, date(start_day * 86400, 'unixepoch') AS start_date, target_minutes, notes
+    FROM goals ORDER BY start_day DESC
+"""
+
+@_cached("goals")
 def get_goals():
     """Retrieves all goals."""
-    with sqlite3.connect(DB_FILE) as conn:
-        df = pd.read_sql_query("SELECT id, goal_type, subject, start_date, target_minutes, notes FROM goals ORDER BY start_date DESC", conn)
-    return df
+    return _read_frame(_GOALS_QUERY)
+
+@_cached("goals")
+def fetch_goals():
+    """Retrieves all goals as a list of Goal rows, newest period first."""
+    return _fetch_rows(Goal, _GOALS_QUERY)
 
 def delete_study_goal(goal_id):
-    """Deletes a study goal."""
-    with sqlite3.connect(DB_FILE) as conn:
+    """Deletes a study goal. Returns True if a row was deleted."""
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM goals WHERE id = ?", (goal_id,))
         conn.commit()
+        _bump_version("goals")
+        return cursor.rowcount > 0
 
+@_cached("goals", "study_log")
 def get_progress(goal_type, subject, for_date):
-    """Calculates the progress for a given goal for a specific date."""
-    with sqlite3.connect(DB_FILE) as conn:
+    """Calculates the progress for a given goal for a specific date.
+
+    Returns (target_minutes, progress_minutes); progress is summed in seconds
+    and converted once, so it is a float with no per-session rounding.
+    """
+    with get_connection() as conn:
         cursor = conn.cursor()
 
         if goal_type == 'daily':
-            start_of_period = for_date.strftime('%Y-%m-%d')
+            start_of_period = to_day(for_date)
             end_of_period = start_of_period
         elif goal_type == 'weekly':
-            start_of_period_dt = for_date - timedelta(days=for_date.weekday())
-            start_of_period = start_of_period_dt.strftime('%Y-%m-%d')
-            end_of_period_dt = start_of_period_dt + timedelta(days=6)
-            end_of_period = end_of_period_dt.strftime('%Y-%m-%d')
+            start_of_period = to_day(for_date) - for_date.weekday()
+            end_of_period = start_of_period + 6
         else:
             return None, 0
 
         # Find the goal for the period
         cursor.execute("""
-            SELECT target_minutes FROM goals
-            WHERE goal_type=? AND subject=? AND start_date=?
+            SELECT subject_id, target_minutes FROM goals
+            WHERE goal_type=? AND subject_id=(SELECT id FROM subjects WHERE name=?) AND start_day=?
         """, (goal_type, subject, start_of_period))
         result = cursor.fetchone()
 
         if not result:
             return None, None # No goal set
 
-        target_minutes = result[0]
+        subject_id, target_minutes = result
 
-        # Calculate progress for the period
-        query_subject = "AND subject = ?" if subject != "All" else ""
+        # Calculate progress for the period from the daily rollup (at most 7 days of rows)
+        query_subject = "AND subject_id = ?" if subject_id != ALL_SUBJECTS_ID else ""
         params = [start_of_period, end_of_period]
-        if subject != "All":
-            params.append(subject)
+        if subject_id != ALL_SUBJECTS_ID:
+            params.append(subject_id)
 
         cursor.execute(f"""
-            SELECT SUM(minutes) FROM study_log
-            WHERE date BETWEEN ? AND ? {query_subject}
+            SELECT SUM(seconds) FROM daily_totals
+            WHERE day BETWEEN ? AND ? {query_subject}
         """, params)
         
-        progress_minutes = cursor.fetchone()[0]
-        return target_minutes, progress_minutes or 0
+        progress_seconds = cursor.fetchone()[0]
+        return target_minutes, (progress_seconds or 0) / 60
+
+# --- Daily Totals Rollup ---
+# daily_totals holds SUM(seconds) per (day, subject_id) and is maintained by
+# the study_log triggers, so progress lookups never aggregate raw logs.
+
+_DAILY_TOTALS_FROM_LOG = """
+    SELECT day, subject_id, SUM(seconds) FROM study_log
+    GROUP BY day, subject_id HAVING SUM(seconds) != 0
+"""
+
+def _rebuild_daily_totals(cursor):
+    cursor.execute("DELETE FROM daily_totals")
+    cursor.execute("INSERT INTO daily_totals (day, subject_id, seconds) " + _DAILY_TOTALS_FROM_LOG)
+
+def _subjects_condition(subjects):
+    """WHERE condition restricting subject_id to the named subjects (one ? per name)."""
+    return f"subject_id IN (SELECT id FROM subjects WHERE name IN ({', '.join('?' * len(subjects))}))"
+
+@_cached("study_log")
+def get_subject_totals(start, end, subjects=None):
+    """Returns [(subject, seconds)] for start <= date <= end, largest total first.
+
+    Summed from daily_totals, so the cost depends on the number of days and
+    subjects in the range, not on the number of logged sessions. subjects
+    optionally restricts the result to a list of subject names.
+    """
+    conditions, params = _day_range("day", start, end)
+    if subjects:
+        conditions.append(_subjects_condition(subjects))
+        params.extend(subjects)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    with get_connection() as conn:
+        return conn.execute(f"""
+            SELECT {_SUBJECT_NAME} AS subject, SUM(seconds) AS seconds FROM daily_totals{where}
+            GROUP BY subject_id ORDER BY seconds DESC, subject
+        """, params).fetchall()
+
+# Day number of the first day of each bucket get_daily_totals() can group by
+_BUCKET_STARTS = {
+    "day": "day",
+    "week": "day - (day + 3) % 7",  # Monday (day 0, 1970-01-01, was a Thursday)
+    "month": "CAST(strftime('%s', day * 86400, 'unixepoch', 'start of month') AS INTEGER) / 86400",
+    "year": "CAST(strftime('%s', day * 86400, 'unixepoch', 'start of year') AS INTEGER) / 86400",
+}
+
+@_cached("study_log")
+def get_daily_totals(start, end, bucket="day"):
+    """Returns [(date string, seconds)] for start <= date <= end, oldest first.
+
+    Seconds are summed over subjects from daily_totals and grouped by bucket
+    ("day", "week", "month" or "year"); each date is the first day of its
+    bucket. Buckets at the edges only count the days inside the range.
+    """
+    bucket_start = _BUCKET_STARTS[bucket]
+    conditions, params = _day_range("day", start, end)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    with get_connection() as conn:
+        # Grouping by day follows the primary key; coarser buckets sort at most
+        # one row per day and subject in the range
+        return conn.execute(f"""
+            SELECT date(({bucket_start}) * 86400, 'unixepoch'), SUM(seconds) FROM daily_totals{where}
+            GROUP BY {bucket_start} ORDER BY {bucket_start}
+        """, params).fetchall()
+
+@_cached("study_log")
+def get_date_range():
+    """Returns the (first, last) dates with any study time, or (None, None) for an empty log."""
+    with get_connection() as conn:
+        first, last = conn.execute("SELECT MIN(day), MAX(day) FROM daily_totals").fetchone()
+    if first is None:
+        return None, None
+    return from_day(first), from_day(last)
+
+def check_daily_totals(repair=False):
+    """Compares daily_totals with the raw study_log.
+
+    Returns a list of (date, subject, rollup_seconds, log_seconds) for every
+    mismatch (None where a row is missing). With repair=True the rollup is
+    rebuilt from the raw logs when any mismatch is found.
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        names = dict(cursor.execute("SELECT id, name FROM subjects"))
+        cursor.execute("SELECT day, subject_id, seconds FROM daily_totals")
+        rollup = {(day, subject_id): seconds for day, subject_id, seconds in cursor}
+        cursor.execute(_DAILY_TOTALS_FROM_LOG)
+        actual = {(day, subject_id): seconds for day, subject_id, seconds in cursor}
+        mismatches = []
+        for day, subject_id in sorted(rollup.keys() | actual.keys()):
+            expected = actual.get((day, subject_id))
+            if rollup.get((day, subject_id)) != expected:
+                mismatches.append((from_day(day).isoformat(), names.get(subject_id, subject_id),
+                                   rollup.get((day, subject_id)), expected))
+        if mismatches and repair:
+            _rebuild_daily_totals(cursor)
+            conn.commit()
+            _bump_version("study_log")
+        return mismatches
+
+# --- Session Journal ---
+# Timer events (start, pause, resume, checkpoint, stop) are appended to
+# session_events by journal.SessionJournal. A session is closed by a "saved"
+# or "discarded" event; a session whose last event is anything else was cut
+# short by a crash. `at` is Unix time and `elapsed` the seconds of study the
+# timer had counted when the event happened.
+
+SESSION_CLOSED_EVENTS = ("saved", "discarded")
+
+UnfinishedSession = namedtuple("UnfinishedSession", "session_id subject started_at last_at elapsed")
+
+def append_session_events(rows):
+    """Appends (session_id, event, at, elapsed, subject) rows in one transaction."""
+    with get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO session_events (session_id, event, at, elapsed, subject) VALUES (?, ?, ?, ?, ?)",
+            rows)
+
+def get_unfinished_sessions():
+    """Returns an UnfinishedSession for every journaled session that was never closed."""
+    with get_connection() as conn:
+        rows = conn.execute(f"""
+            SELECT e.session_id, e.subject, s.started_at, e.at, e.elapsed
+            FROM (SELECT session_id, MIN(at) AS started_at, MAX(id) AS last_id
+                  FROM session_events GROUP BY session_id) AS s
+            JOIN session_events AS e ON e.id = s.last_id
+            WHERE e.event NOT IN ({', '.join('?' * len(SESSION_CLOSED_EVENTS))})
+            ORDER BY s.started_at
+        """, SESSION_CLOSED_EVENTS).fetchall()
+    return list(map(UnfinishedSession._make, rows))
+
+def compact_session_events():
+    """Deletes the events of closed sessions; the journal only needs open ones."""
+    with get_connection() as conn:
+        conn.execute(f"""
+            DELETE FROM session_events WHERE session_id IN (
+                SELECT session_id FROM session_events
+                WHERE event IN ({', '.join('?' * len(SESSION_CLOSED_EVENTS))}))
+        """, SESSION_CLOSED_EVENTS)
 
 # --- Mock Exam Functions ---
 
 def add_mock_exam(date, subject, exam_name, score, max_score, deviation_value):
-    """Adds a new mock exam record to the database."""
-    with sqlite3.connect(DB_FILE) as conn:
-        cursor = conn.cursor()
-        # Convert empty strings to None for numeric fields
-        score = int(score) if score else None
-        max_score = int(max_score) if max_score else None
-        deviation_value = float(deviation_value) if deviation_value else None
-        cursor.execute("""
-            INSERT INTO mock_exams (date, subject, exam_name, score, max_score, deviation_value)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (date, subject, exam_name, score, max_score, deviation_value))
+    """Adds a new mock exam record and returns it as a MockExam.
+
+    Raises ValueError if the values do not pass validate_mock_exam().
+    """
+    row = validate_mock_exam(date, subject, exam_name, score, max_score, deviation_value)
+    with get_connection() as conn:
+        exam = _insert_mock_exam(conn.cursor(), row)
         conn.commit()
+        _bump_version("mock_exams", "subjects")
+        return exam
 
+def _insert_mock_exam(cursor, row):
+    """Inserts one validated mock exam row without committing; returns it as a MockExam."""
+    day, subject, *rest = row
+    cursor.execute("""
+        INSERT INTO mock_exams (day, subject_id, exam_name, score, max_score, deviation_value)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (day, _subject_id(cursor, subject), *rest))
+    return MockExam(cursor.lastrowid, from_day(row[0]).isoformat(), *row[1:])
+
+def insert_mock_exams(rows):
+    """Inserts many validated mock exam rows (see validate_mock_exam) in one transaction.
+
+    Returns the row count.
+    """
+    rows = list(rows)
+    with get_connection() as conn:
+        ids = _subject_ids(conn.cursor(), [row[1] for row in rows])
+        count = conn.executemany("""
+            INSERT INTO mock_exams (day, subject_id, exam_name, score, max_score, deviation_value)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(day, ids[subject], *rest) for day, subject, *rest in rows]).rowcount
+    _bump_version("mock_exams", "subjects")
+    return count
+
+_MOCK_EXAMS_QUERY = f"""
+    SELECT id, date(day * 86400, 'unixepoch') AS date, {_SUBJECT_NAME} AS subject, exam_name, score, max_score, deviation_value
+    FROM mock_exams ORDER BY day DESC
+"""
+
+@_cached("mock_exams")
 def get_mock_exams():
     """Retrieves all mock exam records and returns them as a pandas DataFrame."""
-    with sqlite3.connect(DB_FILE) as conn:
-        df = pd.read_sql_query("SELECT id, date, subject, exam_name, score, max_score, deviation_value FROM mock_exams ORDER BY date DESC", conn)
-    return df
+    return _read_frame(_MOCK_EXAMS_QUERY)
+
+@_cached("mock_exams")
+def fetch_mock_exams():
+    """Retrieves all mock exam records as a list of MockExam rows, newest first."""
+    return _fetch_rows(MockExam, _MOCK_EXAMS_QUERY)
 
 def delete_mock_exam(exam_id):
-    """Deletes a mock exam record."""
-    with sqlite3.connect(DB_FILE) as conn:
+    """Deletes a mock exam record. Returns True if a row was deleted."""
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM mock_exams WHERE id = ?", (exam_id,))
         conn.commit()
+        _bump_version("mock_exams")
+        return cursor.rowcount > 0
 
 # --- Exam Goal Functions ---
 
 def add_exam_goal(subject, exam_name, exam_date, target_score, notes):
-    """Adds a new exam goal."""
-    with sqlite3.connect(DB_FILE) as conn:
+    """Adds a new exam goal and returns it as an ExamGoal."""
+    exam_day = to_day(exam_date) if exam_date else None
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            INSERT INTO mock_exam_goals (subject, exam_name, exam_date, target_score, notes)
+            INSERT INTO mock_exam_goals (subject_id, exam_name, exam_day, target_score, notes)
             VALUES (?, ?, ?, ?, ?)
-        """, (subject, exam_name, exam_date, target_score, notes))
+        """, (_subject_id(cursor, subject), exam_name, exam_day, target_score, notes))
         conn.commit()
+        _bump_version("mock_exam_goals", "subjects")
+        exam_date = from_day(exam_day).isoformat() if exam_day is not None else None
+        return ExamGoal(cursor.lastrowid, subject, exam_name, exam_date, target_score, 'Active', notes)
 
+_EXAM_GOALS_QUERY = f"""
+    SELECT id, {_SUBJECT_NAME} AS subject, exam_name, date(exam_day * 86400, 'unixepoch') AS exam_date, target_score, status, notes
+    FROM mock_exam_goals
+"""
+
+@_cached("mock_exam_goals")
 def get_exam_goals():
     """Retrieves all exam goals."""
-    with sqlite3.connect(DB_FILE) as conn:
-        df = pd.read_sql_query("SELECT id, subject, exam_name, exam_date, target_score, status, notes FROM mock_exam_goals ORDER BY exam_date", conn)
-    return df
+    return _read_frame(_EXAM_GOALS_QUERY + " ORDER BY exam_day")
+
+@_cached("mock_exam_goals")
+def fetch_exam_goals():
+    """Retrieves all exam goals as a list of ExamGoal rows, earliest exam first."""
+    return _fetch_rows(ExamGoal, _EXAM_GOALS_QUERY + " ORDER BY exam_day")
 
 def update_exam_goal_status(goal_id, status):
-    """Updates the status of an exam goal."""
-    with sqlite3.connect(DB_FILE) as conn:
+    """Updates the status of an exam goal and returns the updated ExamGoal,
+    or None if it no longer exists."""
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("UPDATE mock_exam_goals SET status = ? WHERE id = ?", (status, goal_id))
+        cursor.execute(_EXAM_GOALS_QUERY + " WHERE id = ?", (goal_id,))
+        row = cursor.fetchone()
         conn.commit()
+        _bump_version("mock_exam_goals")
+        return ExamGoal._make(row) if row else None
 
 def delete_exam_goal(goal_id):
-    """Deletes an exam goal."""
-    with sqlite3.connect(DB_FILE) as conn:
+    """Deletes an exam goal. Returns True if a row was deleted."""
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM mock_exam_goals WHERE id = ?", (goal_id,))
-        conn.commit()
\ No newline at end of file
+        conn.commit()
+        _bump_version("mock_exam_goals")
+        return cursor.rowcount > 0
+
+# --- Write-behind queue ---
+# Every add_*/set_* call above commits its own transaction, so a burst of
+# inserts is bound by one commit (and, at checkpoints, one fsync) per row.
+# WriteBehindQueue hands the inserts to a writer thread that collects them
+# for a short window (or up to max_rows) and commits each group in a single
+# transaction.
+
+WRITE_BEHIND_DELAY = 0.005
+WRITE_BEHIND_MAX_ROWS = 1000
+
+# kind -> (writer for one row inside the open transaction, table to bump)
+_QUEUED_WRITES = {
+    "study_record": (_insert_study_record, "study_log"),
+    "mock_exam": (_insert_mock_exam, "mock_exams"),
+    "goal": (_upsert_goal, "goals"),
+}
+
+_write_behind_queues = weakref.WeakSet()
+
+class WriteBehindQueue:
+    """Group-commits inserts on a background writer thread.
+
+    Every method returns a concurrent.futures.Future that resolves to the
+    new row (StudyRecord, MockExam or Goal) once its transaction commits.
+    durability decides when the call returns:
+        "sync"   after the commit (the future is already done); the call
+                 raises if the write failed. Concurrent callers still share
+                 one transaction per window.
+        "async"  at once; the row is committed within about `delay` seconds
+                 (WRITE_BEHIND_DELAY by default).
+                 Rows still queued are lost if the process is killed.
+    Input is validated by the caller's thread, so bad values raise
+    ValueError right away. A failed commit fails every row in its group.
+    Queued rows are written to the database current when their group
+    commits: call flush() before switching profiles. Open queues are
+    flushed at interpreter exit.
+    """
+
+    def __init__(self, durability="async", delay=None, max_rows=WRITE_BEHIND_MAX_ROWS):
+        if durability not in ("sync", "async"):
+            raise ValueError("durability must be 'sync' or 'async'")
+        self.durability = durability
+        # Sync callers are already waiting, so by default their group commits as
+        # soon as the writer is free; rows arriving meanwhile form the next group
+        if delay is None:
+            delay = 0.0 if durability == "sync" else WRITE_BEHIND_DELAY
+        self.delay = delay
+        self.max_rows = max_rows
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        _write_behind_queues.add(self)
+
+    def add_record(self, date, subject, minutes):
+        """Queued add_record()."""
+        return self._put("study_record", validate_study_record(date, subject, minutes=minutes))
+
+    def add_session(self, started_at, subject, seconds):
+        """Queued add_session()."""
+        return self._put("study_record", validate_session(started_at, subject, seconds))
+
+    def add_study_row(self, row):
+        """Queues a (day, start, subject, seconds) row from validate_study_record();
+        the row is checked again, so a hand-built one cannot bypass it."""
+        return self._put("study_record", _study_row(*row))
+
+    def add_mock_exam(self, date, subject, exam_name, score, max_score, deviation_value):
+        """Queued add_mock_exam()."""
+        return self._put("mock_exam", validate_mock_exam(date, subject, exam_name, score,
+                                                         max_score, deviation_value))
+
+    def set_goal(self, goal_type, subject, start_date, target_minutes, notes):
+        """Queued set_goal(); the values are checked with validate_goal()."""
+        return self._put("goal", validate_goal(goal_type, subject, start_date, target_minutes, notes))
+
+    def _put(self, kind, row):
+        if self._closed:
+            raise RuntimeError("The write-behind queue is closed.")
+        future = Future()
+        self._queue.put((kind, row, future))
+        if self.durability == "sync":
+            future.result()
+        return future
+
+    def flush(self):
+        """Blocks until everything queued so far has been committed."""
+        self._queue.join()
+
+    def close(self):
+        """Commits what is queued and stops the writer thread."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            batch = [] if item is None else [item]
+            stopping = item is None
+            # Collect whatever else arrives within the window into the same transaction
+            deadline = _monotonic() + self.delay
+            while not stopping and len(batch) < self.max_rows:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - _monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+            try:
+                if batch:
+                    self._commit(batch)
+            finally:
+                for _ in range(len(batch) + stopping):
+                    self._queue.task_done()
+
+    @staticmethod
+    def _commit(batch):
+        try:
+            with get_connection() as conn:
+                cursor = conn.cursor()
+                results = [_QUEUED_WRITES[kind][0](cursor, row) for kind, row, _ in batch]
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        _bump_version("subjects", *{_QUEUED_WRITES[kind][1] for kind, _, _ in batch})
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+def _close_write_behind_queues():
+    for write_queue in list(_write_behind_queues):
+        write_queue.close()
+
+# Registered after close_connections, so it runs first at exit
+atexit.register(_close_write_behind_queues)
+
+# --- Export ---
+# Every table can be read back in chunks for export. Rows are ordered by the
+# table's (indexed) date column, so neither a date filter nor the ordering
+# needs a sort, and only one chunk is held in memory at a time.
+
+EXPORT_TABLES = {
+    # table: (row type, date column, SELECT list)
+    "study_log": (StudyRecord, "day",
+                  f"id, date(day * 86400, 'unixepoch'), time(start, 'unixepoch'), {_SUBJECT_NAME}, seconds"),
+    "goals": (Goal, "start_day",
+              f"id, goal_type, {_SUBJECT_NAME}, date(start_day * 86400, 'unixepoch'), target_minutes, notes"),
+    "mock_exams": (MockExam, "day",
+                   f"id, date(day * 86400, 'unixepoch'), {_SUBJECT_NAME}, exam_name, score, max_score, "
+                   "deviation_value"),
+    "mock_exam_goals": (ExamGoal, "exam_day",
+                        f"id, {_SUBJECT_NAME}, exam_name, date(exam_day * 86400, 'unixepoch'), target_score, "
+                        "status, notes"),
+}
+
+def iter_table_chunks(table, start=None, end=None, chunk_size=10000):
+    """Yields lists of up to chunk_size rows (plain tuples) from one of EXPORT_TABLES.
+
+    start/end filter on the table's date column (None leaves that side open;
+    exam goals without a date are only included when neither is given).
+    Column names are EXPORT_TABLES[table][0]._fields.
+    """
+    _, date_column, select = EXPORT_TABLES[table]
+    conditions, params = _day_range(date_column, start, end)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    cursor = get_connection().execute(
+        f"SELECT {select} FROM {table}{where} ORDER BY {date_column}", params)
+    try:
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        cursor.close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Database maintenance for the study app.")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, help="profile whose database to use")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    check_parser = subparsers.add_parser("check-totals", help="verify daily_totals against study_log")
+    check_parser.add_argument("--repair", action="store_true", help="rebuild daily_totals if it is out of sync")
+    args = parser.parse_args()
+
+    try:
+        set_profile(args.profile)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.command == "check-totals":
+        mismatches = check_daily_totals(repair=args.repair)
+        for day, subject, rollup_seconds, log_seconds in mismatches:
+            print(f"{day} {subject}: rollup={rollup_seconds} log={log_seconds}")
+        if not mismatches:
+            print("daily_totals is consistent with study_log.")
+        elif args.repair:
+            print(f"Rebuilt daily_totals ({len(mismatches)} mismatches fixed).")
@@ -0,0 +1,118 @@
+"""Streaming export of the study database to CSV, JSONL or Parquet.
+
+Each table is read from a cursor in chunks and written out chunk by chunk, so
+memory use stays constant however large the table is. Parquet needs pyarrow;
+the other formats only use the standard library.
+
+Usage:
+    python exporter.py [--format csv|jsonl|parquet] [--output-dir DIR]
+                       [--tables study_log goals ...] [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+                       [--profile NAME]
+"""
+import argparse
+import csv
+import json
+import os
+
+import database
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+FORMATS = ("csv", "jsonl", "parquet")
+CHUNK_SIZE = 10_000
+
+# Column types for Parquet (the other formats take the values as they are)
+_ARROW_TYPES = {
+    "id": "int64", "seconds": "int64", "target_minutes": "int64",
+    "score": "int64", "max_score": "int64", "target_score": "int64",
+    "deviation_value": "float64",
+}
+
+def _write_csv(path, columns, chunks):
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for chunk in chunks:
+            writer.writerows(chunk)
+            count += len(chunk)
+    return count
+
+def _write_jsonl(path, columns, chunks):
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write("".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n"
+                            for row in chunk))
+            count += len(chunk)
+    return count
+
+def _write_parquet(path, columns, chunks):
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow).")
+    schema = pa.schema([(column, getattr(pa, _ARROW_TYPES.get(column, "string"))())
+                        for column in columns])
+    count = 0
+    # One row group per chunk: the writer never holds more than one chunk
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            count += len(chunk)
+    return count
+
+_WRITERS = {"csv": _write_csv, "jsonl": _write_jsonl, "parquet": _write_parquet}
+
+def export_table(table, path, fmt=None, start=None, end=None, chunk_size=CHUNK_SIZE):
+    """Exports one table to path and returns the number of rows written.
+
+    fmt is "csv", "jsonl" or "parquet" (default: taken from the file
+    extension). start/end optionally limit the rows to a date range.
+    """
+    if table not in database.EXPORT_TABLES:
+        raise ValueError(f"Unknown table {table!r}; expected one of {', '.join(database.EXPORT_TABLES)}")
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    columns = database.EXPORT_TABLES[table][0]._fields
+    chunks = database.iter_table_chunks(table, start, end, chunk_size)
+    return _WRITERS[fmt](path, columns, chunks)
+
+def export_all(output_dir, fmt="csv", tables=None, start=None, end=None, chunk_size=CHUNK_SIZE):
+    """Exports each table to <output_dir>/<table>.<fmt>.
+
+    Returns {table: (path, row count)}.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    results = {}
+    for table in tables or database.EXPORT_TABLES:
+        path = os.path.join(output_dir, f"{table}.{fmt}")
+        results[table] = (path, export_table(table, path, fmt, start, end, chunk_size))
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--output-dir", default="export")
+    parser.add_argument("--tables", nargs="+", choices=list(database.EXPORT_TABLES))
+    parser.add_argument("--start", help="first date to include, YYYY-MM-DD")
+    parser.add_argument("--end", help="last date to include, YYYY-MM-DD")
+    parser.add_argument("--profile", default=database.DEFAULT_PROFILE,
+                        help="profile whose database to use")
+    args = parser.parse_args()
+
+    if args.format == "parquet" and not PARQUET_AVAILABLE:
+        parser.error("Parquet export needs pyarrow (pip install pyarrow).")
+    try:
+        database.set_profile(args.profile)
+    except ValueError as e:
+        parser.error(str(e))
+    for table, (path, count) in export_all(args.output_dir, args.format, args.tables,
+                                           args.start, args.end).items():
+        print(f"{table}: {count:,} rows -> {path}")
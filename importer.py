@@ -0,0 +1,127 @@
+"""Bulk import of study records and mock exam results from CSV or JSONL files.
+
+Rows are read one at a time, validated with the same functions the input
+forms use, and inserted with executemany in large transactions. Rows that fail
+validation are written to a rejects CSV (line number, error and the original
+values) instead of stopping the import.
+
+Usage:
+    python importer.py study_log records.csv [--batch-size 50000] [--rejects rejects.csv]
+                       [--profile NAME]
+    python importer.py mock_exams results.jsonl
+
+CSV files need a header row; JSONL files hold one JSON object per line. The
+columns are the ones listed in TABLES (date is YYYY-MM-DD). Study records
+give their duration as seconds or as whole minutes, and may give a start_time
+(HH:MM:SS), so files written by exporter.py import back unchanged.
+"""
+import argparse
+import csv
+import json
+import os
+from collections import namedtuple
+
+import database
+
+# table -> (columns, validator, batch inserter)
+TABLES = {
+    "study_log": (("date", "subject", "minutes", "seconds", "start_time"),
+                  database.validate_study_record, database.insert_study_records),
+    "mock_exams": (("date", "subject", "exam_name", "score", "max_score", "deviation_value"),
+                   database.validate_mock_exam, database.insert_mock_exams),
+}
+BATCH_SIZE = 50_000
+
+ImportResult = namedtuple("ImportResult", "imported rejected rejects_file")
+
+def read_rows(path):
+    """Yields (line_number, row dict, error) from a .csv or .jsonl/.json file, streaming.
+
+    error is None, or a message for a line that could not be parsed (row is then {}).
+    """
+    if path.lower().endswith((".jsonl", ".json")):
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_number, {}, f"Invalid JSON: {e}"
+                    continue
+                if isinstance(row, dict):
+                    yield line_number, row, None
+                else:
+                    yield line_number, {}, "Each line must be a JSON object."
+    else:
+        # utf-8-sig strips the BOM Excel writes at the start of CSV files
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row, None
+
+def import_file(path, table, batch_size=BATCH_SIZE, rejects_file=None, on_progress=None):
+    """Imports a CSV/JSONL file into table ("study_log" or "mock_exams").
+
+    Valid rows are committed every batch_size rows, so an interrupted import
+    keeps everything up to the last full batch. Rejected rows go to
+    rejects_file (default: <path>.rejects.csv, only created if needed).
+    on_progress(imported, rejected) is called after each batch.
+    Returns an ImportResult.
+    """
+    if table not in TABLES:
+        raise ValueError(f"Unknown table {table!r}; expected one of {', '.join(TABLES)}")
+    columns, validate, insert = TABLES[table]
+    rejects_file = rejects_file or f"{path}.rejects.csv"
+    imported = rejected = 0
+    batch = []
+    rejects = rejects_out = None
+    try:
+        for line_number, row, error in read_rows(path):
+            try:
+                if error:
+                    raise ValueError(error)
+                batch.append(validate(*(row.get(column) for column in columns)))
+            except ValueError as e:
+                if rejects is None:
+                    rejects_out = open(rejects_file, "w", encoding="utf-8", newline="")
+                    rejects = csv.writer(rejects_out)
+                    rejects.writerow(("line", "error") + columns)
+                rejects.writerow((line_number, str(e)) + tuple(row.get(column, "") for column in columns))
+                rejected += 1
+            if len(batch) >= batch_size:
+                imported += insert(batch)
+                batch.clear()
+                if on_progress:
+                    on_progress(imported, rejected)
+        if batch:
+            imported += insert(batch)
+            if on_progress:
+                on_progress(imported, rejected)
+    finally:
+        if rejects_out is not None:
+            rejects_out.close()
+    return ImportResult(imported, rejected, rejects_file if rejected else None)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("table", choices=list(TABLES))
+    parser.add_argument("path", help="CSV or JSONL file to import")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--rejects", help="where to write rejected rows (default: <path>.rejects.csv)")
+    parser.add_argument("--profile", default=database.DEFAULT_PROFILE,
+                        help="profile whose database to use")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        parser.error(f"{args.path} does not exist")
+    try:
+        database.set_profile(args.profile)
+    except ValueError as e:
+        parser.error(str(e))
+    result = import_file(args.path, args.table, args.batch_size, args.rejects,
+                         on_progress=lambda imported, rejected: print(f"{imported:,} rows imported...", end="\r"))
+    print(f"Imported {result.imported:,} rows into {args.table}.")
+    if result.rejected:
+        print(f"Rejected {result.rejected:,} rows; see {result.rejects_file}")
@@ -0,0 +1,89 @@
+"""Background job executor for the Tkinter app.
+
+Database calls and report generation run on a small thread pool so they never
+block the Tk event loop (and with it the timer display). Finished jobs are put
+on a queue that the UI thread polls with root.after, so completion callbacks
+always run on the UI thread and may touch widgets freely.
+"""
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+POLL_INTERVAL_MS = 50
+
+class JobExecutor:
+    """Runs functions on worker threads and delivers their results on the Tk main loop."""
+
+    def __init__(self, root, max_workers=2, on_busy_change=None):
+        """on_busy_change(busy) is called on the UI thread when the first job starts
+        and when the last pending job finishes (used for progress indication)."""
+        self.root = root
+        self.on_busy_change = on_busy_change
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._results = queue.Queue()
+        self._pending = 0
+        self._poll_id = None
+        self._closed = False
+
+    @property
+    def busy(self):
+        return self._pending > 0
+
+    def submit(self, func, *args, on_done=None, on_error=None):
+        """Runs func(*args) on a worker thread.
+
+        on_done(result) or on_error(exception) is then called on the UI thread.
+        Without on_error, failures go to Tk's report_callback_exception like any
+        other callback error. Jobs submitted after shutdown() are ignored (None
+        is returned).
+        """
+        if self._closed:
+            return None
+        self._pending += 1
+        if self._pending == 1 and self.on_busy_change:
+            self.on_busy_change(True)
+        future = self._pool.submit(func, *args)
+        future.add_done_callback(lambda f: self._results.put((f, on_done, on_error)))
+        if self._poll_id is None:
+            self._poll_id = self.root.after(POLL_INTERVAL_MS, self._poll)
+        return future
+
+    def _poll(self):
+        """Delivers finished jobs to their callbacks (runs on the UI thread)."""
+        self._poll_id = None
+        while True:
+            try:
+                future, on_done, on_error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            try:
+                error = future.exception()
+                if error is None:
+                    if on_done:
+                        on_done(future.result())
+                elif on_error:
+                    on_error(error)
+                else:
+                    raise error
+            except Exception as e:
+                # Keep delivering the other results even if one callback fails
+                self.root.report_callback_exception(type(e), e, e.__traceback__)
+        if self._pending:
+            self._poll_id = self.root.after(POLL_INTERVAL_MS, self._poll)
+        elif self.on_busy_change:
+            self.on_busy_change(False)
+
+    def shutdown(self):
+        """Runs every submitted job to completion, queued ones included, then delivers
+        their results.
+
+        Nothing is cancelled: a queued job may be a write (e.g. saving a session)
+        whose on_done records that it committed. Callbacks still run on the
+        calling (UI) thread, before the window is destroyed.
+        """
+        self._closed = True
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._pool.shutdown(wait=True)
+        self._poll()
@@ -0,0 +1,121 @@
+"""Crash-safe journal of timer sessions.
+
+The timer appends an event (start, pause, resume, checkpoint, stop, and
+finally saved or discarded) for every state change, plus a checkpoint every
+few seconds while running. Recording an event only puts a tuple on a queue;
+a background thread writes whatever has accumulated in one transaction
+(group commit), so the timer loop never waits for the disk. With WAL and
+synchronous=NORMAL a commit survives an application crash without an fsync
+per event.
+
+On the next start, database.get_unfinished_sessions() finds sessions that
+were never saved or discarded, with the study time counted up to their last
+event.
+"""
+import queue
+import threading
+import time
+
+import database
+
+# How long the writer waits for more events before committing a batch
+COMMIT_DELAY = 0.5
+# While a timer runs, a checkpoint is journaled every this many seconds, which
+# bounds how much study time a crash can lose
+CHECKPOINT_SECONDS = 15
+
+_STOP = object()
+
+class SessionJournal:
+    """Records timer events for the current session through a group-commit writer thread."""
+
+    def __init__(self, commit_delay=COMMIT_DELAY):
+        self.commit_delay = commit_delay
+        self.session_id = None
+        self.subject = None
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def begin(self, subject, elapsed=0.0):
+        """Starts a new session and records its "start" event."""
+        # Microseconds since the epoch: unique per session and ordered by start
+        self.session_id = time.time_ns() // 1000
+        self.subject = subject
+        self.record("start", elapsed)
+
+    def record(self, event, elapsed):
+        """Queues an event for the current session (returns immediately)."""
+        if self.session_id is None:
+            return
+        self._start_writer()
+        self._queue.put((self.session_id, event, time.time(), elapsed, self.subject))
+
+    def _start_writer(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="journal", daemon=True)
+            self._thread.start()
+
+    def end(self, event, elapsed):
+        """Closes the current session with a "saved" or "discarded" event."""
+        self.record(event, elapsed)
+        self.session_id = None
+
+    def detach(self, elapsed):
+        """Stops journaling the current session without closing it; returns a handle
+        for close_session().
+
+        Used while the session is being saved: the "saved" event is only
+        recorded once the insert has committed, so a crash (or a failed save)
+        in between leaves the session open for recovery.
+        """
+        self.record("checkpoint", elapsed)
+        session = (self.session_id, self.subject)
+        self.session_id = None
+        return session
+
+    def close_session(self, session, event, elapsed):
+        """Closes a session returned by detach() with a "saved" or "discarded" event."""
+        session_id, subject = session
+        if session_id is None:
+            return
+        self._start_writer()
+        self._queue.put((session_id, event, time.time(), elapsed, subject))
+
+    def flush(self):
+        """Blocks until every queued event has been committed."""
+        self._queue.join()
+
+    def close(self):
+        """Commits the queued events and stops the writer thread."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = [] if item is _STOP else [item]
+            stopping = item is _STOP
+            # Collect whatever else arrives within the commit delay into the same transaction
+            deadline = time.monotonic() + self.commit_delay
+            while not stopping:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+            try:
+                if batch:
+                    database.append_session_events(batch)
+            except Exception as e:
+                # The journal is a safety net; never let it take the timer down
+                print(f"Session journal write failed: {e}")
+            finally:
+                for _ in range(len(batch) + (1 if stopping else 0)):
+                    self._queue.task_done()
+            if stopping:
+                return
@@ -0,0 +1,154 @@
+"""Local load generator for server.py: latency percentiles and requests per second.
+
+Opens --connections keep-alive connections and sends requests back to back on
+each for --duration seconds. A --writes share of the requests are
+POST /records, a --lists share stream one week of GET /records, and the rest
+are GET /progress lookups. Latency is measured per request, from writing the
+request to reading the last byte of the response.
+
+Usage:
+    python loadtest.py [--url http://127.0.0.1:8080] [--connections 32] [--duration 10]
+                       [--writes 0.2] [--lists 0.02]
+    python loadtest.py --spawn [...]    start server.py on a throwaway database first
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+SUBJECTS = ("Chemistry", "English", "Math", "Physics")
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))]
+
+async def read_response(reader):
+    """Reads one response (Content-Length or chunked body); returns (status, body)."""
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding") == "chunked":
+        parts = []
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            data = await reader.readexactly(size + 2)
+            if size == 0:
+                break
+            parts.append(data[:-2])
+        return status, b"".join(parts)
+    return status, await reader.readexactly(int(headers.get("content-length", 0)))
+
+def build_request(method, path, host, payload=None):
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(body)}\r\n"
+    if body:
+        head += "Content-Type: application/json\r\n"
+    return (head + "\r\n").encode("latin-1") + body
+
+def next_request(host, writes, lists):
+    """Returns (kind, request bytes) for a random request of the configured mix."""
+    roll = random.random()
+    if roll < writes:
+        payload = {"subject": random.choice(SUBJECTS), "seconds": random.randint(60, 3600),
+                   "start_time": f"{random.randint(6, 22):02d}:{random.randint(0, 59):02d}:00"}
+        return "POST /records", build_request("POST", "/records", host, payload)
+    if roll < writes + lists:
+        today = date.today()
+        path = f"/records?start={today - timedelta(days=6)}&end={today}"
+        return "GET /records (week)", build_request("GET", path, host)
+    return "GET /progress", build_request("GET", "/progress?goal_type=daily&subject=All", host)
+
+async def worker(host, port, deadline, writes, lists, results):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            kind, request = next_request(host, writes, lists)
+            start = time.perf_counter()
+            writer.write(request)
+            status, _ = await read_response(reader)
+            results.setdefault(kind, []).append((time.perf_counter() - start, status))
+    finally:
+        writer.close()
+
+async def run_load(host, port, connections, duration, writes, lists):
+    # A goal, so the progress lookups read both the goals table and the rollup
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(build_request("POST", "/goals", host, {
+        "goal_type": "daily", "subject": "All", "start_date": date.today().isoformat(),
+        "target_minutes": 120}))
+    await read_response(reader)
+    writer.close()
+
+    results = {}
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(worker(host, port, deadline, writes, lists, results)
+                           for _ in range(connections)))
+    return results, time.perf_counter() - start
+
+def print_report(results, elapsed):
+    print(f"{'request':<22} {'count':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    every = []
+    for kind, samples in sorted(results.items()):
+        latencies = sorted(latency for latency, _ in samples)
+        errors = sum(status >= 400 for _, status in samples)
+        every.extend(latencies)
+        print(f"{kind:<22} {len(samples):>8} {len(samples) / elapsed:>9,.0f} "
+              f"{percentile(latencies, 50) * 1000:>8.2f} {percentile(latencies, 99) * 1000:>8.2f} "
+              f"{latencies[-1] * 1000:>8.2f} {errors:>7}")
+    every.sort()
+    print(f"{'all':<22} {len(every):>8} {len(every) / elapsed:>9,.0f} "
+          f"{percentile(every, 50) * 1000:>8.2f} {percentile(every, 99) * 1000:>8.2f} "
+          f"{(every[-1] if every else 0) * 1000:>8.2f}")
+
+def spawn_server(tmp_dir):
+    """Starts server.py on a free port with a fresh profile in tmp_dir; returns (process, port)."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+    process = subprocess.Popen([sys.executable, server, "--port", str(port), "--profile", "loadtest"],
+                               cwd=tmp_dir, stdout=subprocess.PIPE, text=True)
+    print(process.stdout.readline().strip())  # "Serving ... on ..." once it is listening
+    return process, port
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--writes", type=float, default=0.2, help="share of POST /records")
+    parser.add_argument("--lists", type=float, default=0.02, help="share of streamed GET /records")
+    parser.add_argument("--spawn", action="store_true", help="start a server on a temporary database")
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    process = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.spawn:
+            process, port = spawn_server(tmp_dir)
+        try:
+            results, elapsed = asyncio.run(run_load(host, port, args.connections, args.duration,
+                                                    args.writes, args.lists))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+    print_report(results, elapsed)
@@ -0,0 +1,281 @@
+"""A PDF writer that streams each finished page to the output file.
+
+FPDF keeps every page in memory until output(), so a report's memory grows
+with its length. StreamingPDF offers the subset of the FPDF interface the
+reports use (cell, text, line, rect, image, set_font, header/footer hooks and
+automatic page breaks) but compresses and writes a page as soon as the next
+one starts. Only the current page and one file offset per PDF object are
+kept, so memory stays flat however many rows a report has.
+
+Text uses the PDF core fonts (no embedding) with FPDF's metrics; characters
+outside Latin-1 are written as '?'.
+"""
+import os
+import zlib
+from array import array
+from functools import lru_cache
+
+from fpdf.fonts import CORE_FONTS, CORE_FONTS_CHARWIDTHS
+
+# A4 portrait, in millimetres like FPDF's default unit
+PAGE_WIDTH = 210.0
+PAGE_HEIGHT = 297.0
+SCALE = 72 / 25.4  # points per millimetre
+MARGIN = 10.0
+CELL_MARGIN = MARGIN / 10
+LINE_WIDTH = 0.2
+
+# Object numbers fixed up front; everything else is numbered as it is written
+PAGES_OBJECT = 1
+CATALOG_OBJECT = 2
+
+def _latin1(text):
+    return str(text).encode("latin-1", "replace").decode("latin-1")
+
+def _escape(text):
+    text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return text.replace("\r", "").replace("\n", " ")
+
+@lru_cache(maxsize=4096)
+def string_width(text, font_key, size):
+    """Width in millimetres of text set in a core font at size points."""
+    widths = CORE_FONTS_CHARWIDTHS[font_key]
+    return sum(widths.get(char, 0) for char in _latin1(text)) * size / 1000 / SCALE
+
+@lru_cache(maxsize=4096)
+def fit_text(text, font_key, size, width):
+    """Returns text, shortened with '...' if needed to fit in width millimetres."""
+    text = _latin1(text)
+    if string_width(text, font_key, size) <= width:
+        return text
+    while text and string_width(text + "...", font_key, size) > width:
+        text = text[:-1]
+    return text + "..." if text else ""
+
+class StreamingPDF:
+    """Writes a PDF to filename page by page. Use as a context manager, or call
+    close() to finish the file; a block that raises removes the partial file."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.w, self.h = PAGE_WIDTH, PAGE_HEIGHT
+        self.l_margin = self.t_margin = self.r_margin = MARGIN
+        self.b_margin = 2 * MARGIN
+        self.c_margin = CELL_MARGIN
+        self.x, self.y = self.l_margin, self.t_margin
+        self.font_key, self.font_size = None, 0  # font_size is in points
+        self.page = 0
+        self._file = open(filename, "wb")
+        self._position = 0
+        self._offsets = array("q", [0, 0, 0])  # by object number; 0 is unused
+        self._page_objects = array("q")
+        self._fonts = {}   # font key -> (resource name, object number)
+        self._images = []  # (resource name, object number) of the images written so far
+        self._content = None
+        self._last_height = 0
+        self._in_hook = False
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self.filename)
+
+    # --- FPDF-compatible page layout ---
+
+    @property
+    def epw(self):
+        return self.w - self.l_margin - self.r_margin
+
+    def set_auto_page_break(self, auto, margin=2 * MARGIN):
+        # Page breaks are always automatic; only the bottom margin is configurable
+        self.b_margin = margin
+
+    def header(self):
+        """Called at the top of every page; override to draw page headings."""
+
+    def footer(self):
+        """Called at the bottom of every page; override to draw page footers."""
+
+    def page_no(self):
+        return self.page
+
+    def add_page(self):
+        font = (self.font_key, self.font_size)
+        if self._content is not None:
+            self._run_hook(self.footer)
+            self._finish_page()
+        self.page += 1
+        self._content = [f"{LINE_WIDTH * SCALE:.2f} w"]
+        self.x, self.y = self.l_margin, self.t_margin
+        if font[0] is not None:
+            self._select_font(*font)
+        self._run_hook(self.header)
+        if font[0] is not None:
+            self._select_font(*font)
+
+    def set_font(self, family, style="", size=None):
+        key = family.lower() + style.upper()
+        if key not in CORE_FONTS:
+            raise ValueError(f"{family} {style} is not a PDF core font")
+        self._select_font(key, size or self.font_size)
+
+    def get_x(self):
+        return self.x
+
+    def get_y(self):
+        return self.y
+
+    def set_y(self, y):
+        self.x = self.l_margin
+        self.y = y if y >= 0 else self.h + y
+
+    def ln(self, h=None):
+        self.x = self.l_margin
+        self.y += self._last_height if h is None else h
+
+    def will_page_break(self, height):
+        return not self._in_hook and self.y + height > self.h - self.b_margin
+
+    def get_string_width(self, text):
+        return string_width(text, self.font_key, self.font_size)
+
+    def cell(self, w, h, txt="", border=0, ln=0, align="L"):
+        """Draws a w x h cell at the current position like FPDF.cell (w=0 runs to
+        the right margin), clipping txt to the cell width."""
+        if self.will_page_break(h):
+            x = self.x
+            self.add_page()
+            self.x = x
+        if w == 0:
+            w = self.w - self.r_margin - self.x
+        if border:
+            self.rect(self.x, self.y, w, h)
+        if txt != "":
+            txt = fit_text(txt, self.font_key, self.font_size, w - 2 * self.c_margin)
+            width = string_width(txt, self.font_key, self.font_size)
+            if align == "R":
+                dx = w - self.c_margin - width
+            elif align == "C":
+                dx = (w - width) / 2
+            else:
+                dx = self.c_margin
+            self.text(self.x + dx, self.y + h / 2 + 0.3 * self.font_size / SCALE, txt)
+        self._last_height = h
+        if ln:
+            self.x = self.l_margin
+            self.y += h
+        else:
+            self.x += w
+
+    # --- Drawing ---
+
+    def text(self, x, y, txt):
+        """Writes the string txt with its baseline starting at (x, y); no clipping."""
+        txt = txt if txt.isascii() else _latin1(txt)
+        self._content.append(f"BT {x * SCALE:.2f} {(self.h - y) * SCALE:.2f} Td ({_escape(txt)}) Tj ET")
+
+    def line(self, x1, y1, x2, y2):
+        self._content.append(f"{x1 * SCALE:.2f} {(self.h - y1) * SCALE:.2f} m "
+                             f"{x2 * SCALE:.2f} {(self.h - y2) * SCALE:.2f} l S")
+
+    def rect(self, x, y, w, h):
+        self._content.append(f"{x * SCALE:.2f} {(self.h - y) * SCALE:.2f} "
+                             f"{w * SCALE:.2f} {-h * SCALE:.2f} re S")
+
+    def image(self, pixels, x, y, w, h=None):
+        """Draws an image given as (width_px, height_px, RGB bytes) at (x, y), w
+        millimetres wide; h defaults to keeping the aspect ratio."""
+        width_px, height_px, rgb = pixels
+        if h is None:
+            h = w * height_px / width_px
+        name, number = f"I{len(self._images) + 1}", self._new_object()
+        data = zlib.compress(rgb)
+        self._write_object(number, (
+            f"<< /Type /XObject /Subtype /Image /Width {width_px} /Height {height_px} "
+            f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /FlateDecode "
+            f"/Length {len(data)} >>").encode(), data)
+        self._images.append((name, number))
+        self._content.append(f"q {w * SCALE:.2f} 0 0 {h * SCALE:.2f} {x * SCALE:.2f} "
+                             f"{(self.h - y - h) * SCALE:.2f} cm /{name} Do Q")
+
+    # --- Output ---
+
+    def close(self):
+        """Finishes the last page and writes the page tree, cross-reference
+        table and trailer."""
+        if self._content is None:
+            self.add_page()
+        self._run_hook(self.footer)
+        self._finish_page()
+        self._offsets[PAGES_OBJECT] = self._position
+        self._write(f"{PAGES_OBJECT} 0 obj\n<< /Type /Pages /Count {len(self._page_objects)} "
+                    f"/MediaBox [0 0 {self.w * SCALE:.2f} {self.h * SCALE:.2f}] /Kids [".encode())
+        for start in range(0, len(self._page_objects), 1000):
+            chunk = self._page_objects[start:start + 1000]
+            self._write(" ".join(f"{number} 0 R" for number in chunk).encode() + b" ")
+        self._write(b"] >>\nendobj\n")
+        self._offsets[CATALOG_OBJECT] = self._position
+        self._write(f"{CATALOG_OBJECT} 0 obj\n<< /Type /Catalog /Pages {PAGES_OBJECT} 0 R >>\n"
+                    f"endobj\n".encode())
+        xref = self._position
+        self._write(f"xref\n0 {len(self._offsets)}\n0000000000 65535 f \n".encode())
+        for start in range(1, len(self._offsets), 1000):
+            chunk = self._offsets[start:start + 1000]
+            self._write("".join(f"{offset:010d} 00000 n \n" for offset in chunk).encode())
+        self._write(f"trailer\n<< /Size {len(self._offsets)} /Root {CATALOG_OBJECT} 0 R >>\n"
+                    f"startxref\n{xref}\n%%EOF\n".encode())
+        self._file.close()
+
+    # --- Internals ---
+
+    def _run_hook(self, hook):
+        self._in_hook = True
+        try:
+            hook()
+        finally:
+            self._in_hook = False
+
+    def _select_font(self, key, size):
+        if key not in self._fonts:
+            self._fonts[key] = (f"F{len(self._fonts) + 1}", self._new_object())
+            self._write_object(self._fonts[key][1], (
+                f"<< /Type /Font /Subtype /Type1 /BaseFont /{CORE_FONTS[key]} "
+                f"/Encoding /WinAnsiEncoding >>").encode())
+        self.font_key, self.font_size = key, size
+        if self._content is not None:
+            self._content.append(f"BT /{self._fonts[key][0]} {size:.2f} Tf ET")
+
+    def _finish_page(self):
+        data = zlib.compress("\n".join(self._content).encode("latin-1"))
+        self._content = None
+        contents = self._new_object()
+        self._write_object(contents, f"<< /Filter /FlateDecode /Length {len(data)} >>".encode(), data)
+        fonts = " ".join(f"/{name} {number} 0 R" for name, number in self._fonts.values())
+        images = " ".join(f"/{name} {number} 0 R" for name, number in self._images)
+        page = self._new_object()
+        self._write_object(page, (
+            f"<< /Type /Page /Parent {PAGES_OBJECT} 0 R /Contents {contents} 0 R "
+            f"/Resources << /ProcSet [/PDF /Text /ImageC] /Font << {fonts} >> "
+            f"/XObject << {images} >> >> >>").encode())
+        self._page_objects.append(page)
+
+    def _new_object(self):
+        self._offsets.append(0)
+        return len(self._offsets) - 1
+
+    def _write_object(self, number, dictionary, stream=None):
+        self._offsets[number] = self._position
+        self._write(f"{number} 0 obj\n".encode() + dictionary)
+        if stream is not None:
+            self._write(b"\nstream\n" + stream + b"\nendstream")
+        self._write(b"\nendobj\n")
+
+    def _write(self, data):
+        self._file.write(data)
+        self._position += len(data)
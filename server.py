@@ -0,0 +1,308 @@
+"""Headless HTTP/JSON service for the study database.
+
+Serves the database.py operations to many clients (kiosks, scripts) from one
+central store, over HTTP/1.1 with keep-alive, using only asyncio streams:
+
+    POST /records      {"subject", "seconds" or "minutes", "date"?, "start_time"?}
+    GET  /records      ?start=YYYY-MM-DD&end=YYYY-MM-DD      (streamed JSON array)
+    GET  /progress     ?goal_type=daily|weekly&subject=All&date=YYYY-MM-DD
+    POST /goals        {"goal_type", "subject", "start_date", "target_minutes", "notes"?}
+    GET  /goals                                              (streamed JSON array)
+    POST /mock-exams   {"date", "subject", "exam_name", "score"?, "max_score"?, "deviation_value"?}
+    GET  /mock-exams   ?start=YYYY-MM-DD&end=YYYY-MM-DD      (streamed JSON array)
+
+The event loop only parses requests and writes responses. Reads run on a
+bounded pool of reader threads, each with its own pooled connection, and all
+writes go through one database.WriteBehindQueue, whose writer thread is the
+only one writing: SQLite never sees more than readers + 1 connections and
+writers never wait on each other's locks. Concurrent writes are coalesced:
+they are collected for up to BATCH_DELAY seconds (or BATCH_MAX_ROWS rows) and
+committed in one transaction, and each request is answered after its commit.
+List endpoints stream rows from a cursor in chunks (chunked transfer
+encoding), so a long history is never held in memory.
+
+Invalid input is answered with 400 and {"error": message}, using the same
+validators as the app's input forms.
+
+Usage:
+    python server.py [--host 127.0.0.1] [--port 8080] [--readers 4] [--profile NAME]
+"""
+import argparse
+import asyncio
+import json
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from datetime import date
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import database
+
+READERS = 4
+# Write coalescing: a group is committed this long after its first row arrives,
+# or as soon as it holds BATCH_MAX_ROWS rows
+BATCH_DELAY = 0.002
+BATCH_MAX_ROWS = 500
+# Rows per chunk of a streamed list response
+STREAM_CHUNK_ROWS = 1000
+MAX_BODY_BYTES = 1 << 20
+
+class HTTPError(Exception):
+    """Ends a request with the given status and {"error": message}."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class Stream:
+    """A handler result that streams the rows of an export table as a JSON array."""
+
+    def __init__(self, table, start=None, end=None):
+        self.table, self.start, self.end = table, start, end
+
+def _json_body(body):
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "The request body must be JSON.") from None
+    if not isinstance(data, dict):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "The request body must be a JSON object.")
+    return data
+
+def _parse_date(value):
+    try:
+        return database.from_day(database.to_day(value))
+    except (TypeError, ValueError):
+        raise ValueError("Date must be in YYYY-MM-DD format.") from None
+
+def _date_param(query, name):
+    """A YYYY-MM-DD query parameter as a date (None if absent); ValueError (400) if malformed."""
+    value = query.get(name)
+    return None if value is None else _parse_date(value)
+
+class StudyServer:
+    """Request handling for the JSON API (see the module docstring for the routes)."""
+
+    def __init__(self, readers=READERS):
+        self.readers = ThreadPoolExecutor(readers, thread_name_prefix="db-read")
+        # async durability: the event loop never blocks; each request awaits its own commit
+        self.writes = database.WriteBehindQueue("async", BATCH_DELAY, BATCH_MAX_ROWS)
+        self.routes = {
+            ("POST", "/records"): self.add_record,
+            ("GET", "/records"): self.list_records,
+            ("GET", "/progress"): self.progress,
+            ("POST", "/goals"): self.add_goal,
+            ("GET", "/goals"): self.list_goals,
+            ("POST", "/mock-exams"): self.add_mock_exam,
+            ("GET", "/mock-exams"): self.list_mock_exams,
+        }
+        self.paths = {path for _, path in self.routes}
+
+    def close(self):
+        """Waits for the reads in flight and commits every queued write."""
+        self.readers.shutdown(wait=True)
+        self.writes.close()
+
+    async def read(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.readers, func, *args)
+
+    # --- Handlers: return (status, payload) or a Stream ---
+    async def add_record(self, query, body):
+        data = _json_body(body)
+        row = database.validate_study_record(
+            data.get("date") or date.today().isoformat(), data.get("subject"),
+            data.get("minutes"), data.get("seconds"), data.get("start_time"))
+        record = await asyncio.wrap_future(self.writes.add_study_row(row))
+        return HTTPStatus.CREATED, record._asdict()
+
+    async def list_records(self, query, body):
+        return Stream("study_log", _date_param(query, "start"), _date_param(query, "end"))
+
+    async def progress(self, query, body):
+        goal_type = query.get("goal_type", "daily")
+        if goal_type not in ("daily", "weekly"):
+            raise ValueError("Goal type must be daily or weekly.")
+        subject = query.get("subject", "All")
+        for_date = _date_param(query, "date") or date.today()
+        target, progress = await self.read(database.get_progress, goal_type, subject, for_date)
+        return HTTPStatus.OK, {"goal_type": goal_type, "subject": subject, "date": for_date.isoformat(),
+                               "target_minutes": target, "progress_minutes": progress}
+
+    async def add_goal(self, query, body):
+        data = _json_body(body)
+        goal = await asyncio.wrap_future(self.writes.set_goal(
+            data.get("goal_type"), data.get("subject"), data.get("start_date"),
+            data.get("target_minutes"), data.get("notes")))
+        return HTTPStatus.CREATED, goal._asdict()
+
+    async def list_goals(self, query, body):
+        return Stream("goals", _date_param(query, "start"), _date_param(query, "end"))
+
+    async def add_mock_exam(self, query, body):
+        data = _json_body(body)
+        exam = await asyncio.wrap_future(self.writes.add_mock_exam(
+            *(data.get(name) for name in
+              ("date", "subject", "exam_name", "score", "max_score", "deviation_value"))))
+        return HTTPStatus.CREATED, exam._asdict()
+
+    async def list_mock_exams(self, query, body):
+        return Stream("mock_exams", _date_param(query, "start"), _date_param(query, "end"))
+
+    # --- HTTP ---
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.send_json(writer, HTTPStatus.BAD_REQUEST, {"error": "Bad request line."}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY_BYTES:
+                    await self.send_json(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                         {"error": "Request body too large."}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                await self.dispatch(writer, method, target, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # client went away, or sent a malformed header / oversized line
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def dispatch(self, writer, method, target, body, keep_alive):
+        url = urlsplit(target)
+        handler = self.routes.get((method, url.path))
+        try:
+            if handler is None:
+                if url.path in self.paths:
+                    raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not allowed on {url.path}.")
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"No such endpoint: {url.path}")
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            result = await handler(query, body)
+        except HTTPError as e:
+            result = e.status, {"error": str(e)}
+        except ValueError as e:
+            result = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except Exception as e:
+            print(f"{method} {target} failed: {e!r}")
+            result = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error."}
+        if isinstance(result, Stream):
+            await self.send_stream(writer, result, keep_alive)
+        else:
+            await self.send_json(writer, *result, keep_alive)
+
+    @staticmethod
+    def _head(status, keep_alive, extra):
+        connection = "" if keep_alive else "Connection: close\r\n"
+        return (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: application/json\r\n{extra}{connection}\r\n").encode("latin-1")
+
+    async def send_json(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(self._head(status, keep_alive, f"Content-Length: {len(body)}\r\n") + body)
+        await writer.drain()
+
+    async def send_stream(self, writer, stream, keep_alive):
+        """Writes the table's rows as a JSON array, one HTTP chunk per cursor chunk.
+
+        A reader thread walks the cursor and hands chunks to the event loop; at
+        most two chunks are in flight, so a slow client holds back the query
+        instead of letting rows pile up in memory.
+        """
+        loop = asyncio.get_running_loop()
+        columns = database.EXPORT_TABLES[stream.table][0]._fields
+        chunks = asyncio.Queue()
+        slots = threading.Semaphore(2)
+        stop = threading.Event()
+
+        def produce():
+            rows = database.iter_table_chunks(stream.table, stream.start, stream.end, STREAM_CHUNK_ROWS)
+            try:
+                for chunk in rows:
+                    slots.acquire()
+                    if stop.is_set():
+                        return
+                    loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+                loop.call_soon_threadsafe(chunks.put_nowait, None)
+            except Exception as e:
+                loop.call_soon_threadsafe(chunks.put_nowait, e)
+            finally:
+                rows.close()  # closes the cursor on the thread that opened it
+
+        producer = loop.run_in_executor(self.readers, produce)
+        writer.write(self._head(HTTPStatus.OK, keep_alive, "Transfer-Encoding: chunked\r\n"))
+        separator = b"["
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    # The status line is already out; all we can do is drop the connection
+                    print(f"Streaming {stream.table} failed: {chunk!r}")
+                    raise ConnectionAbortedError("stream aborted")
+                slots.release()
+                data = separator + ",".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False)
+                                            for row in chunk).encode("utf-8")
+                separator = b","
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                await writer.drain()
+            tail = b"]" if separator == b"," else b"[]"
+            writer.write(b"%x\r\n%s\r\n0\r\n\r\n" % (len(tail), tail))
+            await writer.drain()
+        finally:
+            stop.set()
+            slots.release()  # wakes the producer if it is waiting for a slot
+            with suppress(Exception):
+                await producer
+
+async def serve(host="127.0.0.1", port=8080, readers=READERS):
+    """Serves until SIGINT or SIGTERM, then lets the database work in flight finish."""
+    server = StudyServer(readers)
+    listener = await asyncio.start_server(server.handle_connection, host, port)
+    address = listener.sockets[0].getsockname()
+    print(f"Serving {database.DB_FILE} on http://{address[0]}:{address[1]}", flush=True)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with suppress(NotImplementedError):  # not available on Windows; Ctrl+C still works
+            loop.add_signal_handler(sig, stop.set)
+    try:
+        async with listener:
+            await stop.wait()
+    finally:
+        server.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--readers", type=int, default=READERS, help="reader threads (connections)")
+    parser.add_argument("--profile", default=database.DEFAULT_PROFILE,
+                        help="profile whose database to serve")
+    args = parser.parse_args()
+
+    try:
+        database.set_profile(args.profile)
+    except ValueError as e:
+        parser.error(str(e))
+    with suppress(KeyboardInterrupt):
+        asyncio.run(serve(args.host, args.port, args.readers))
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# The app is a set of top-level modules, not an installed package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Points database.DB_FILE at a fresh database in tmp_path for one test."""
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "test.db"))
+    database.init_db()
+    yield database.DB_FILE
+    database.clear_query_cache()
+    database.close_connections()
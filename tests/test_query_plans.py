@@ -0,0 +1,40 @@
+"""EXPLAIN QUERY PLAN checks for the reads that run on every click.
+
+A range read (a day range, a history page, one goal) must only SEARCH an
+index; a read that lists a whole table may walk an index in order, but none
+may scan a table without an index or sort in a temporary b-tree.
+"""
+import pytest
+
+import benchmark
+import database
+
+HOT_QUERIES = benchmark.hot_queries()
+
+
+@pytest.fixture
+def seeded_db(temp_db):
+    benchmark.seed_hot_query_data()
+    return temp_db
+
+
+@pytest.mark.parametrize("label, query, lists_table", HOT_QUERIES,
+                         ids=[label for label, _, _ in HOT_QUERIES])
+def test_hot_query_uses_an_index(seeded_db, label, query, lists_table):
+    plans = benchmark.query_plans(query)
+    assert plans, f"{label} ran no SELECT"
+    for sql, plan in plans:
+        assert not benchmark.bad_plan_steps(plan, lists_table), f"{sql}\n{' | '.join(plan)}"
+
+
+def test_full_table_scan_is_reported(seeded_db):
+    plans = benchmark.query_plans(
+        lambda: database.get_connection().execute("SELECT * FROM study_log WHERE seconds > 60").fetchall())
+    assert benchmark.bad_plan_steps(plans[0][1])
+
+
+def test_whole_index_scan_is_reported_for_range_reads(seeded_db):
+    plans = benchmark.query_plans(
+        lambda: database.get_connection().execute("SELECT * FROM goals ORDER BY start_day").fetchall())
+    assert benchmark.bad_plan_steps(plans[0][1], lists_table=False)
+    assert not benchmark.bad_plan_steps(plans[0][1], lists_table=True)
@@ -0,0 +1,216 @@
+"""Timer engines for the study timer: a stopwatch and a pomodoro cycle.
+
+The engines are plain state machines with no Tk dependency. Time comes from
+an injectable clock (time.monotonic by default, so wall-clock changes do not
+affect sessions), which lets them be driven by a fake clock in tests.
+
+The UI drives an engine with three calls per tick:
+    tick()               advances pomodoro phases, returns the phase that just ended
+    display_seconds()    the whole seconds to show; redraw only when it changes
+    next_tick_delay()    seconds until the displayed value next changes
+Scheduling the next tick with next_tick_delay() wakes the UI on the second
+boundary itself, instead of every 1000 ms from whatever offset the timer
+happened to start at, so the display never drifts or skips a second.
+"""
+import math
+import time
+
+# Engine states
+IDLE = "idle"          # not started (or reset)
+RUNNING = "running"
+PAUSED = "paused"
+STOPPED = "stopped"    # finished; the elapsed time can still be read
+
+# Pomodoro phases and their lengths in seconds
+WORK = "Work"
+SHORT_BREAK = "Short Break"
+LONG_BREAK = "Long Break"
+WORK_SECONDS = 25 * 60
+SHORT_BREAK_SECONDS = 5 * 60
+LONG_BREAK_SECONDS = 15 * 60
+CYCLES_PER_LONG_BREAK = 4
+
+def format_clock(seconds):
+    """Formats whole seconds as HH:MM:SS."""
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+def format_countdown(seconds):
+    """Formats whole seconds as MM:SS."""
+    minutes, seconds = divmod(seconds, 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+class Stopwatch:
+    """Counts up from zero; can be paused and resumed any number of times.
+
+    State transitions return True when they applied and False when the
+    timer was not in a state that allows them (e.g. pause() while paused).
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self.state = IDLE
+        self._accumulated = 0.0   # seconds from finished running spans
+        self._started_at = None   # clock() when the current running span began
+
+    def start(self):
+        if self.state != IDLE:
+            return False
+        self._started_at = self.clock()
+        self.state = RUNNING
+        return True
+
+    def pause(self):
+        if self.state != RUNNING:
+            return False
+        self._accumulated += self.clock() - self._started_at
+        self.state = PAUSED
+        return True
+
+    def resume(self):
+        if self.state != PAUSED:
+            return False
+        self._started_at = self.clock()
+        self.state = RUNNING
+        return True
+
+    def stop(self):
+        if self.state == RUNNING:
+            self._accumulated += self.clock() - self._started_at
+        elif self.state != PAUSED:
+            return False
+        self.state = STOPPED
+        return True
+
+    def elapsed(self):
+        """Seconds counted so far (a float)."""
+        if self.state == RUNNING:
+            return self._accumulated + (self.clock() - self._started_at)
+        return self._accumulated
+
+    def studied(self):
+        """Seconds of study in the current session (everything the stopwatch counted)."""
+        return self.elapsed()
+
+    def tick(self):
+        """A stopwatch has no phases; always returns None."""
+        return None
+
+    def display_seconds(self):
+        return int(self.elapsed())
+
+    def next_tick_delay(self):
+        return 1.0 - self.elapsed() % 1.0
+
+    def format(self, seconds):
+        return format_clock(seconds)
+
+class Pomodoro:
+    """Work / break cycle: work, then a short break (a long one every few cycles).
+
+    The countdown shows the remaining time rounded up, so a phase starts at
+    25:00 and ends on the tick that reaches 00:00. Each phase is timed from
+    the previous phase's scheduled end, so a late tick never shortens or
+    lengthens the next phase.
+    """
+
+    def __init__(self, clock=time.monotonic, work_seconds=WORK_SECONDS,
+                 short_break_seconds=SHORT_BREAK_SECONDS, long_break_seconds=LONG_BREAK_SECONDS,
+                 cycles_per_long_break=CYCLES_PER_LONG_BREAK):
+        self.clock = clock
+        self.durations = {WORK: work_seconds, SHORT_BREAK: short_break_seconds,
+                          LONG_BREAK: long_break_seconds}
+        self.cycles_per_long_break = cycles_per_long_break
+        self.reset()
+
+    def reset(self):
+        self.state = IDLE
+        self.phase = None
+        self.cycles = 0           # completed work phases
+        self._phase_end = None    # clock() at which the running phase ends
+        self._remaining = float(self.durations[WORK])  # frozen while not running
+
+    def _begin(self, phase, at):
+        self.phase = phase
+        self._phase_end = at + self.durations[phase]
+        self.state = RUNNING
+
+    def start(self):
+        if self.state != IDLE:
+            return False
+        self._begin(WORK, self.clock())
+        return True
+
+    def pause(self):
+        if self.state != RUNNING:
+            return False
+        self._remaining = self.remaining()
+        self.state = PAUSED
+        return True
+
+    def resume(self):
+        if self.state != PAUSED:
+            return False
+        self._phase_end = self.clock() + self._remaining
+        self.state = RUNNING
+        return True
+
+    def stop(self):
+        if self.state not in (RUNNING, PAUSED):
+            return False
+        self._remaining = self.remaining()
+        self.state = STOPPED
+        return True
+
+    def remaining(self):
+        """Seconds left in the current phase (a float)."""
+        if self.state == RUNNING:
+            return max(0.0, self._phase_end - self.clock())
+        return self._remaining
+
+    def studied(self):
+        """Seconds worked in the current work phase (0 during breaks)."""
+        if self.phase != WORK:
+            return 0.0
+        return self.durations[WORK] - self.remaining()
+
+    def tick(self):
+        """Ends the current phase if its time is up and returns it (else None).
+
+        After work, the break starts right away; after a break the engine stops.
+        """
+        if self.state != RUNNING or self.clock() < self._phase_end:
+            return None
+        finished = self.phase
+        if finished == WORK:
+            self.cycles += 1
+            long_break = self.cycles % self.cycles_per_long_break == 0
+            self._begin(LONG_BREAK if long_break else SHORT_BREAK, self._phase_end)
+        else:
+            self._remaining = 0.0
+            self.state = STOPPED
+        return finished
+
+    def status(self):
+        """Label for the current phase, e.g. "Work (1/4)"."""
+        if self.phase == WORK:
+            return f"Work ({self.cycles + 1}/{self.cycles_per_long_break})"
+        if self.phase == SHORT_BREAK:
+            return f"Short Break ({self.cycles}/{self.cycles_per_long_break})"
+        return self.phase or ""
+
+    def display_seconds(self):
+        return math.ceil(self.remaining())
+
+    def next_tick_delay(self):
+        remaining = self.remaining()
+        if remaining <= 0:
+            return 0.0
+        return remaining % 1.0 or 1.0
+
+    def format(self, seconds):
+        return format_countdown(seconds)
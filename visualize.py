@@ -1,44 +1,271 @@
-
 import tkinter as tk
 from tkinter import ttk
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from collections import OrderedDict, namedtuple
+from datetime import date, timedelta
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+import matplotlib.dates as mdates
 import database
 
-def show_analysis_window(root):
-    analysis_window = tk.Toplevel(root)
-    analysis_window.title("Analysis")
-    analysis_window.geometry("800x600")
+# Period choices for the analysis window: label -> number of days (None = all history)
+PERIODS = {
+    "Last 7 days": 7,
+    "Last 30 days": 30,
+    "Last 365 days": 365,
+    "All time": None,
+}
+DEFAULT_PERIOD = "All time"
+
+# The time chart never draws more than MAX_BARS bars: the finest bucket that
+# fits the visible range is chosen (name, approximate days per bucket).
+MAX_BARS = 120
+BUCKETS = (("day", 1), ("week", 7), ("month", 30.44), ("year", 365.25))
+BUCKET_TITLES = {"day": "Daily", "week": "Weekly", "month": "Monthly", "year": "Yearly"}
+# Wait this long after the last zoom/pan event before loading finer buckets
+ZOOM_DELAY_MS = 250
+
+PeriodData = namedtuple("PeriodData", "subject_totals start end bucket bucket_totals")
+
+def choose_bucket(start, end):
+    """Returns the finest bucket that shows start..end in at most MAX_BARS bars."""
+    span = (end - start).days + 1
+    for name, days in BUCKETS:
+        if span / days <= MAX_BARS:
+            return name
+    return BUCKETS[-1][0]
+
+def load_buckets(start, end):
+    """Returns (bucket, [(bucket start date string, seconds)]) for start..end."""
+    bucket = choose_bucket(start, end)
+    return bucket, database.get_daily_totals(start, end, bucket)
+
+# Aggregates per period: (DB_FILE, days, today) -> (study_log version, PeriodData).
+# An entry is reused until a write to study_log bumps the table version.
+# Entries from before today can never be asked for again and are dropped when
+# a new one is added; the rest (one per profile and period) are kept in LRU
+# order up to AGGREGATE_CACHE_SIZE.
+AGGREGATE_CACHE_SIZE = 4 * len(PERIODS)
+_aggregate_cache = OrderedDict()
+
+def load_period(days):
+    """Returns the PeriodData for the last `days` days (all history if None).
+
+    Everything is summed in SQL from the daily rollup and cached until the
+    next write to study_log, so reopening the window does not touch the database.
+    """
+    today = date.today()
+    key = (database.DB_FILE, days, today)
+    version = database.table_version("study_log")  # read before querying
+    cached = _aggregate_cache.get(key)
+    if cached is not None and cached[0] == version:
+        _aggregate_cache.move_to_end(key)
+        return cached[1]
+    if days is None:
+        start, end = database.get_date_range()
+    else:
+        start, end = today - timedelta(days=days - 1), today
+    if start is None:
+        data = PeriodData([], None, None, None, [])
+    else:
+        data = PeriodData(database.get_subject_totals(start, end), start, end,
+                          *load_buckets(start, end))
+    for stale in [k for k in _aggregate_cache if k[2] != today]:
+        del _aggregate_cache[stale]
+    _aggregate_cache[key] = (version, data)
+    _aggregate_cache.move_to_end(key)
+    while len(_aggregate_cache) > AGGREGATE_CACHE_SIZE:
+        _aggregate_cache.popitem(last=False)
+    return data
+
+def draw_subjects(ax, subject_totals):
+    """Draws the study-time-by-subject pie chart."""
+    ax.clear()
+    ax.pie([seconds for _, seconds in subject_totals],
+           labels=[subject for subject, _ in subject_totals],
+           autopct='%1.1f%%', startangle=90)
+    ax.set_title('Study Time by Subject')
+
+def draw_buckets(ax, bucket, bucket_totals):
+    """Draws the study time bar chart on a date axis and returns its bars."""
+    ax.clear()
+    width = dict(BUCKETS)[bucket] * 0.9
+    bars = ax.bar([date.fromisoformat(day) for day, _ in bucket_totals],
+                  [seconds / 60 for _, seconds in bucket_totals], width=width, align='edge')
+    ax.set_title(f'{BUCKET_TITLES[bucket]} Study Time')
+    ax.set_ylabel('Minutes')
+    # A date axis keeps the number of tick labels bounded at any zoom level
+    locator = mdates.AutoDateLocator()
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    return bars
+
+class AnalysisWindow:
+    """The analysis window. It is created once, hidden when closed and shown again
+    on the next open, keeping its figure and the data it last drew."""
+
+    def __init__(self, root, jobs=None):
+        self.jobs = jobs
+        self.window = tk.Toplevel(root)
+        self.window.title("Analysis")
+        self.window.geometry("800x600")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        # Period selector
+        controls = ttk.Frame(self.window)
+        controls.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
+        ttk.Label(controls, text="Period:").pack(side=tk.LEFT)
+        self.period = tk.StringVar(value=DEFAULT_PERIOD)
+        period_menu = ttk.Combobox(controls, textvariable=self.period, values=list(PERIODS),
+                                   state="readonly", width=15)
+        period_menu.pack(side=tk.LEFT, padx=5)
+        period_menu.bind("<<ComboboxSelected>>", self.refresh)
+
+        # One figure for the lifetime of the window (filled in once the data has loaded)
+        self.fig = Figure(figsize=(12, 5))
+        self.ax_subjects, self.ax_time = self.fig.subplots(1, 2)
+        self.message = self.fig.text(0.5, 0.5, "Loading...", ha='center', va='center')
+        self.ax_subjects.set_visible(False)
+        self.ax_time.set_visible(False)
+
+        # What each axis currently shows, so unchanged charts are not redrawn
+        self.state = "loading"  # "loading", "empty" or "data"
+        self.data = None          # PeriodData of the selected period
+        self.bucket = None        # bucket and range of the bars on the time chart
+        self.bars_range = None
+        self.bars = None
+        self.zoom_after_id = None
+        self.zoom_request = 0     # bumped per zoom load, so stale results are dropped
+
+        # Add a close button
+        close_button = ttk.Button(self.window, text="Close", command=self.close)
+        close_button.pack(side=tk.BOTTOM, pady=10)
+
+        # Embed the plots into the Tkinter window, with a zoom/pan toolbar
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.window)
+        self.toolbar = NavigationToolbar2Tk(self.canvas, self.window, pack_toolbar=False)
+        self.toolbar.update()
+        self.toolbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.canvas.draw()
+        self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+
+    def show(self):
+        self.window.deiconify()
+        self.window.lift()
+        self.refresh()
+
+    def close(self):
+        self.window.withdraw()
+
+    def refresh(self, event=None):
+        days = PERIODS[self.period.get()]
+        if self.jobs is None:
+            self.redraw(load_period(days))
+        else:
+            self.jobs.submit(load_period, days, on_done=self.redraw)
+
+    def redraw(self, data):
+        """Updates only the charts whose data changed since the last draw."""
+        if not self.window.winfo_exists():  # the app may have been closed while loading
+            return
+        changed = False
+        has_data = bool(data.subject_totals)
+        state = "data" if has_data else "empty"
+        if state != self.state:
+            self.message.set_text("No data to analyze.")
+            self.message.set_visible(not has_data)
+            self.ax_subjects.set_visible(has_data)
+            self.ax_time.set_visible(has_data)
+            self.state = state
+            changed = True
+        previous, self.data = self.data, data
+        if has_data and (previous is None or data.subject_totals != previous.subject_totals):
+            draw_subjects(self.ax_subjects, data.subject_totals)
+            changed = True
+        if has_data and (previous is None or data[1:] != previous[1:]):
+            same_bars = (previous is not None and self.bars is not None
+                         and (self.bucket, self.bars_range) == (data.bucket, (data.start, data.end))
+                         and [day for day, _ in data.bucket_totals] == [day for day, _ in previous.bucket_totals])
+            if same_bars:
+                # Same buckets, new values (e.g. a session added today): just resize the bars
+                for bar, (_, seconds) in zip(self.bars, data.bucket_totals):
+                    bar.set_height(seconds / 60)
+                self.ax_time.relim()
+                self.ax_time.autoscale_view()
+            else:
+                self.zoom_request += 1  # drop zoom loads for the previous period
+                self.draw_time_chart(data.bucket, data.bucket_totals, (data.start, data.end),
+                                     (data.start, data.end + timedelta(days=1)))
+                self.toolbar.update()  # the period's full range becomes the toolbar's home view
+            changed = True
+        if changed:
+            self.fig.tight_layout()
+            self.canvas.draw_idle()
 
-    df = database.get_all_records()
+    def draw_time_chart(self, bucket, bucket_totals, bars_range, xlim):
+        self.bars = draw_buckets(self.ax_time, bucket, bucket_totals)
+        self.bucket, self.bars_range = bucket, bars_range
+        self.ax_time.set_xlim(*xlim)
+        # Axes.clear() drops callbacks, so reconnect after every draw
+        self.ax_time.callbacks.connect('xlim_changed', self.on_xlim_changed)
 
-    if df.empty:
-        ttk.Label(analysis_window, text="No data to analyze.").pack(pady=20)
-        return
+    # --- Zoom / pan ---
+    def on_xlim_changed(self, ax):
+        # Fired for every step of a drag; load once the view has settled
+        if self.zoom_after_id is not None:
+            self.window.after_cancel(self.zoom_after_id)
+        self.zoom_after_id = self.window.after(ZOOM_DELAY_MS, self.load_visible_buckets)
 
-    # Create a figure with two subplots
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
+    def load_visible_buckets(self):
+        """Loads bars at the resolution the visible range needs, if the current ones don't fit."""
+        self.zoom_after_id = None
+        if self.data is None or self.data.start is None:
+            return
+        x0, x1 = self.ax_time.get_xlim()
+        start, end = mdates.num2date(x0).date(), mdates.num2date(x1).date()
+        bucket = choose_bucket(start, end)
+        loaded_start, loaded_end = self.bars_range
+        if bucket == self.bucket and loaded_start <= max(start, self.data.start) \
+                and min(end, self.data.end) <= loaded_end:
+            return  # the bars already cover the view at the right resolution
+        # Load one extra view width on each side so short pans need no reload,
+        # but never beyond the selected period
+        span = end - start
+        fetch_start = max(start - span, self.data.start)
+        fetch_end = min(end + span, self.data.end)
+        if fetch_start > fetch_end:
+            return
+        self.zoom_request += 1
+        request = self.zoom_request
+        def on_loaded(bucket_totals):
+            self.show_zoomed(request, bucket, bucket_totals, (fetch_start, fetch_end))
+        if self.jobs is None:
+            on_loaded(database.get_daily_totals(fetch_start, fetch_end, bucket))
+        else:
+            self.jobs.submit(database.get_daily_totals, fetch_start, fetch_end, bucket,
+                             on_done=on_loaded)
 
-    # Pie chart for study time per subject
-    subject_summary = df.groupby('subject')['minutes'].sum()
-    ax1.pie(subject_summary, labels=subject_summary.index, autopct='%1.1f%%', startangle=90)
-    ax1.set_title('Study Time by Subject')
+    def show_zoomed(self, request, bucket, bucket_totals, bars_range):
+        if request != self.zoom_request or not self.window.winfo_exists():
+            return  # a newer zoom (or a period change) superseded this load
+        self.draw_time_chart(bucket, bucket_totals, bars_range, self.ax_time.get_xlim())
+        self.canvas.draw_idle()
 
-    # Bar chart for daily study time
-    date_summary = df.groupby('date')['minutes'].sum()
-    date_summary.plot(kind='bar', ax=ax2)
-    ax2.set_title('Daily Study Time')
-    ax2.set_ylabel('Minutes')
-    ax2.tick_params(axis='x', rotation=45)
+_window = None
 
-    plt.tight_layout()
+def show_analysis_window(root, jobs=None):
+    """Opens the analysis window. With a jobs.JobExecutor, data is loaded on a worker thread.
 
-    # Embed the plots into the Tkinter window
-    canvas = FigureCanvasTkAgg(fig, master=analysis_window)
-    canvas.draw()
-    canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+    The window is reused: closing it only hides it, and reopening redraws just
+    what changed since it was last shown.
+    """
+    global _window
+    if _window is None or not _window.window.winfo_exists():
+        _window = AnalysisWindow(root, jobs)
+    _window.show()
+    return _window
 
-    # Add a close button
-    close_button = ttk.Button(analysis_window, text="Close", command=analysis_window.destroy)
-    close_button.pack(side=tk.BOTTOM, pady=10)
+def refresh_analysis_window():
+    """Reloads the analysis window if it is showing (e.g. after switching profiles)."""
+    if _window is not None and _window.window.winfo_exists() \
+            and _window.window.winfo_viewable():
+        _window.refresh()